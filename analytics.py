@@ -0,0 +1,110 @@
+import datetime
+import numpy as np
+import database
+
+# Metrics engine for the Analytics screen.
+# A (scope, owner, metric, range) series is read from the perf_rollups day buckets once,
+# turned into NumPy arrays, and every derived stat is computed vectorized in one pass.
+# Results are cached under that key. Each entry remembers how many logs it was built
+# from; when new logs arrive (from this app or another instance) the count changes
+# and the entry is rebuilt on its next request.
+# Engine calls touch the DB, so scenes run them on the DB worker (db_worker.submit).
+
+ROLLING_DAYS = 7
+PERCENTILES = (10, 50, 90)
+
+
+class AnalyticsEngine:
+    def __init__(self, max_entries=64):
+        self.cache = {} # (scope, owner_id, metric_id, start, end) -> (log count, result)
+        self.max_entries = max_entries
+
+    def invalidate(self, scope=None, owner_id=None):
+        """Drop cached results (all, or one player/team)."""
+        for key in list(self.cache):
+            if (scope is None or key[0] == scope) and (owner_id is None or key[1] == owner_id):
+                del self.cache[key]
+
+    def get(self, scope, owner_id, metric_id, start, end):
+        key = (scope, owner_id, metric_id, start, end)
+        stamp = database.get_perf_log_count(scope, owner_id, metric_id, start, end)
+        hit = self.cache.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+        result = compute(database.get_perf_rollup(scope, owner_id, metric_id, 'day', start, end), start, end)
+        if len(self.cache) >= self.max_entries:
+            self.cache.pop(next(iter(self.cache))) # Oldest entry
+        self.cache[key] = (stamp, result)
+        return result
+
+
+def compute(buckets, start, end, window=ROLLING_DAYS):
+    """
+    buckets: day rollups [{'bucket', 'count', 'sum', 'min', 'max'}, ...] (oldest first).
+    Returns arrays for the chart plus summary stats; 'days' is None when there is no data.
+    """
+    if not buckets:
+        return {'days': None, 'start': start, 'end': end}
+
+    day0 = np.datetime64(start)
+    dates = np.array([b['bucket'] for b in buckets], dtype='datetime64[D]')
+    counts = np.array([b['count'] for b in buckets], dtype=np.float64)
+    sums = np.array([b['sum'] for b in buckets], dtype=np.float64)
+    idx = (dates - day0).astype(np.int64) # Day offset inside the range
+    daily = sums / counts
+
+    # Dense per-day totals -> count-weighted rolling average via cumulative sums
+    span = int((np.datetime64(end) - day0).astype(np.int64)) + 1
+    dense_sum = np.zeros(span)
+    dense_n = np.zeros(span)
+    dense_sum[idx] = sums
+    dense_n[idx] = counts
+    cs_sum = np.concatenate(([0.0], np.cumsum(dense_sum)))
+    cs_n = np.concatenate(([0.0], np.cumsum(dense_n)))
+    lo = np.maximum(idx + 1 - window, 0)
+    win_n = cs_n[idx + 1] - cs_n[lo]
+    rolling = (cs_sum[idx + 1] - cs_sum[lo]) / win_n
+
+    # Weeks (Monday based) -> weekly means and week-over-week change. Every calendar week up to
+    # the one holding `end` gets a slot (NaN when empty), so a change is only ever between two
+    # adjacent weeks, never across a gap
+    first = datetime.date.fromisoformat(start)
+    monday0 = np.datetime64(first - datetime.timedelta(days=first.weekday()))
+    week = ((dates - monday0).astype(np.int64)) // 7
+    n_weeks = int((np.datetime64(end) - monday0).astype(np.int64)) // 7 + 1
+    wk_n = np.bincount(week, weights=counts, minlength=n_weeks)
+    wk_sum = np.bincount(week, weights=sums, minlength=n_weeks)
+    has = wk_n > 0
+    dense_mean = np.full(n_weeks, np.nan)
+    dense_mean[has] = wk_sum[has] / wk_n[has]
+    wow = np.diff(dense_mean) # NaN unless both weeks have data
+    wk_mean = dense_mean[has]
+    wk_start = monday0 + np.nonzero(has)[0] * 7
+
+    pct = np.percentile(daily, PERCENTILES)
+    return {
+        'start': start, 'end': end,
+        'days': idx, # x positions (days since start)
+        'dates': dates,
+        'daily': daily,
+        'rolling': rolling,
+        'min': np.array([b['min'] for b in buckets]),
+        'max': np.array([b['max'] for b in buckets]),
+        'percentiles': dict(zip(PERCENTILES, pct)),
+        'weeks': wk_start,
+        'weekly': wk_mean,
+        'wow': wow, # Per calendar week from the second one on
+        'latest': float(daily[-1]),
+        'latest_rolling': float(rolling[-1]),
+        'last_wow': float(wow[-1]) if len(wow) and not np.isnan(wow[-1]) else None, # This week vs last week
+        'logs': int(counts.sum()),
+    }
+
+
+def date_range(days, today=None):
+    # Last `days` days ending today, as ISO strings
+    end = today or datetime.date.today()
+    return (end - datetime.timedelta(days=days - 1)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+engine = AnalyticsEngine()
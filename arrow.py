@@ -21,6 +21,15 @@ class DrillArrow:
         else:
             self.points.append(new_pos)
 
+    def to_dict(self):
+        return {'type': self.type, 'points': [[p.x, p.y] for p in self.points]}
+
+    @classmethod
+    def from_dict(cls, d):
+        arrow = cls((0, 0), d.get('type', 'run'))
+        arrow.points = [pygame.Vector2(p) for p in d['points']]
+        return arrow
+
     def draw(self, surface):
         if len(self.points) < 2: return
 
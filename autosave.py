@@ -0,0 +1,65 @@
+import threading
+import database
+
+# Write-behind autosave for the Editor.
+# The frame loop only appends small op records to an in-memory list; a background
+# thread writes them to the editor_journal table in one transaction every few seconds.
+# If the app dies before SAVE, the journal is replayed the next time the drill is opened
+# (the opener reads it on the DB worker: database.get_editor_state).
+
+AUTOSAVE_INTERVAL = 3.0 # seconds
+
+
+class AutosaveJournal:
+    def __init__(self, session_key, interval=AUTOSAVE_INTERVAL):
+        self.session_key = session_key
+        self.interval = interval
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = True
+        self.discard = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record(self, op):
+        # Called from the main loop: never touches the disk
+        with self.lock:
+            self.pending.append(op)
+
+    def run(self):
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+        if self.discard:
+            with self.lock:
+                self.pending = []
+            try:
+                database.clear_journal(self.session_key)
+            except Exception as e:
+                print(f"Autosave Error: {e}")
+        else:
+            self.flush()
+        database.close_connection()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch: return
+        try:
+            database.append_journal(self.session_key, batch)
+        except Exception as e:
+            print(f"Autosave Error: {e}")
+            with self.lock:
+                self.pending = batch + self.pending # Retry on the next tick
+
+    def close(self, discard=False):
+        """Stop the writer. discard=True drops the journal (drill was saved or abandoned)."""
+        # The writer thread does the final flush/delete itself, so the UI never waits on
+        # the disk; only an app exit (keep the journal) waits for the last flush to land.
+        self.discard = discard
+        self.running = False
+        self.wake.set()
+        if not discard:
+            self.thread.join(timeout=2)
@@ -6,6 +6,14 @@ SCREEN_HEIGHT = 800
 PITCH_MARGIN = 60
 UI_HEIGHT = 100
 
+# Frame Rate: full rate while there is input or animation, otherwise the loop sleeps in
+# pygame.event.wait until an event arrives (input, DB result, forecast) or IDLE_WAIT_MS passes
+FPS = 60
+IDLE_AFTER_MS = 500 # No input for this long (and nothing animating) -> idle
+IDLE_WAIT_MS = 250 # Idle redraw interval (~4 FPS)
+CURSOR_BLINK_MS = 500
+RESIZE_DEBOUNCE_MS = 150 # Relayout once the window has stopped changing size for this long
+
 # Player Defaults
 PLAYER_RADIUS = 16
 FONT_SIZE = 18
@@ -3,13 +3,74 @@ import hashlib
 import os
 import json
 import datetime
+import threading
+import csv
+import math
+import time
+from contextlib import contextmanager
+import payload
 
 DB_NAME = "football_planner.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    # Create Users Table
+# --- Connection Manager ---
+# One long-lived connection per thread (sqlite3 connections can't be shared across threads).
+# WAL lets readers run while another app instance writes; busy_timeout waits for locks
+# instead of failing. sqlite3 caches prepared statements per connection, so reusing the
+# connection also reuses the compiled SQL.
+
+_local = threading.local()
+
+def get_conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_NAME, timeout=5.0, isolation_level=None, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL') # Safe with WAL, far fewer fsyncs
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-8000') # ~8 MB page cache
+        _local.conn = conn
+        _local.tx_depth = 0
+    return conn
+
+@contextmanager
+def transaction():
+    """
+    with transaction() as c: ...  -> commits once at the end (rolls back on error).
+    Nested blocks join the outer transaction.
+    """
+    conn = get_conn()
+    outer = _local.tx_depth == 0
+    if outer: conn.execute('BEGIN IMMEDIATE') # Take the write lock up front (no upgrade deadlocks)
+    _local.tx_depth += 1
+    try:
+        yield conn.cursor()
+    except BaseException:
+        _local.tx_depth -= 1
+        if outer: conn.execute('ROLLBACK')
+        raise
+    _local.tx_depth -= 1
+    if outer: conn.execute('COMMIT')
+
+def close_connection():
+    # Close this thread's connection (worker threads call this before exiting)
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+# --- Schema Migrations ---
+# Each migration runs exactly once, in order; PRAGMA user_version stores how many
+# have been applied. To change the schema, append a new function to MIGRATIONS.
+
+def _add_column(c, table, column, decl):
+    # Older databases may already have it (they were patched with ALTER TABLE before versioning)
+    cols = [r[1] for r in c.execute(f'PRAGMA table_info({table})')]
+    if column not in cols:
+        c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+def _m001_base_tables(c):
     c.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,8 +83,6 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
-    # Create Sessions Table
     c.execute('''
         CREATE TABLE IF NOT EXISTS sessions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,13 +91,11 @@ def init_db():
             date TEXT,
             time TEXT DEFAULT '10:00',
             status TEXT,
-            data TEXT,
+            data TEXT, -- Legacy JSON blob (NULL once content lives in session_steps/session_objects)
             assigned_to_id INTEGER, -- Optional: Assign to specific player
             FOREIGN KEY(user_id) REFERENCES users(id)
         )
     ''')
-
-    # Create Performance Logs Table
     c.execute('''
         CREATE TABLE IF NOT EXISTS performance_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,8 +106,6 @@ def init_db():
             FOREIGN KEY(user_id) REFERENCES users(id)
         )
     ''')
-
-    # Create Notifications Table
     c.execute('''
         CREATE TABLE IF NOT EXISTS notifications (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,49 +118,200 @@ def init_db():
             FOREIGN KEY(target_user_id) REFERENCES users(id)
         )
     ''')
-    # Backward compatibility
-    try:
-        c.execute('ALTER TABLE sessions ADD COLUMN time TEXT DEFAULT "10:00"')
-    except: pass
-    try:
-        c.execute('ALTER TABLE users ADD COLUMN role TEXT DEFAULT "player"')
-    except: pass
-    try:
-        c.execute('ALTER TABLE users ADD COLUMN status TEXT DEFAULT "APPROVED"')
-    except: pass
-    try:
-        c.execute('ALTER TABLE users ADD COLUMN parent_coach_id INTEGER')
-    except: pass
-    conn.commit()
-    conn.close()
+    # Columns that were added after the first release
+    _add_column(c, 'sessions', 'time', "TEXT DEFAULT '10:00'")
+    _add_column(c, 'sessions', 'assigned_to_id', 'INTEGER')
+    _add_column(c, 'users', 'role', "TEXT DEFAULT 'player'")
+    _add_column(c, 'users', 'status', "TEXT DEFAULT 'APPROVED'")
+    _add_column(c, 'users', 'parent_coach_id', 'INTEGER')
+
+def _m002_session_rows(c):
+    # Session content rows (see Session Management)
+    _add_column(c, 'sessions', 'note', 'TEXT')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS session_steps (
+            session_id INTEGER NOT NULL,
+            step_idx INTEGER NOT NULL,
+            data TEXT NOT NULL, -- {obj_id: [x, y]} (payload.encode; JSON in older rows)
+            PRIMARY KEY (session_id, step_idx)
+        ) WITHOUT ROWID
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS session_objects (
+            session_id INTEGER NOT NULL,
+            kind TEXT NOT NULL, -- 'players' or 'text_labels'
+            ord INTEGER NOT NULL,
+            data TEXT NOT NULL, -- Object dict (payload.encode; JSON in older rows)
+            PRIMARY KEY (session_id, kind, ord)
+        ) WITHOUT ROWID
+    ''')
+
+def _m003_editor_journal(c):
+    # Editor autosave journal (unsaved edits, replayed after a crash)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS editor_journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_key TEXT NOT NULL, -- 'session:<id>' or 'draft:<user_id>:<date>'
+            op TEXT NOT NULL, -- JSON operation record
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_journal_key ON editor_journal(session_key, id)')
+
+def _m004_indexes(c):
+    # Indexes for the hot access paths (see HOT_QUERIES / check_query_plans)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_date ON sessions(user_id, date)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_notifications_target_created ON notifications(target_user_id, created_at)')
+    # Includes value so trend reads never touch the table (covering index)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_perf_user_metric_date ON performance_logs(user_id, metric_id, date, value)')
+    # Team roster / pending list, and the driver side of the team-average join
+    c.execute('CREATE INDEX IF NOT EXISTS idx_users_coach_status ON users(parent_coach_id, status)')
+
+def _m005_perf_rollups(c):
+    # Pre-aggregated performance stats (see Performance & Analytics)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS perf_rollups (
+            scope TEXT NOT NULL, -- 'player' (owner = user id) or 'team' (owner = coach id)
+            owner_id INTEGER NOT NULL,
+            metric_id TEXT NOT NULL,
+            period TEXT NOT NULL, -- 'day' or 'week'
+            bucket TEXT NOT NULL, -- 'YYYY-MM-DD' (the Monday for weeks)
+            n INTEGER NOT NULL,
+            total REAL NOT NULL,
+            min_value REAL NOT NULL,
+            max_value REAL NOT NULL,
+            PRIMARY KEY (scope, owner_id, metric_id, period, bucket)
+        ) WITHOUT ROWID
+    ''')
+    # Kept current by a trigger, so every insert path (log_performance, import_performance) is covered
+    upsert = '''
+        ON CONFLICT (scope, owner_id, metric_id, period, bucket) DO UPDATE SET
+            n = n + 1, total = total + excluded.total,
+            min_value = min(min_value, excluded.min_value), max_value = max(max_value, excluded.max_value);
+    '''
+    rows = []
+    for period, bucket in (('day', 'NEW.date'), ('week', PERF_WEEK_BUCKET.format(col='NEW.date'))):
+        rows.append(f"INSERT INTO perf_rollups SELECT 'player', NEW.user_id, NEW.metric_id, '{period}', {bucket}, 1, NEW.value, NEW.value, NEW.value WHERE 1 {upsert}")
+        rows.append(f"INSERT INTO perf_rollups SELECT 'team', parent_coach_id, NEW.metric_id, '{period}', {bucket}, 1, NEW.value, NEW.value, NEW.value "
+                    f"FROM users WHERE id = NEW.user_id AND parent_coach_id IS NOT NULL {upsert}")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_perf_rollups AFTER INSERT ON performance_logs BEGIN {' '.join(rows)} END")
+    _rebuild_perf_rollups(c)
+
+def _m006_drill_contents(c):
+    # Content-addressed drill content (see Session Management): rows belong to a content id
+    # that any number of sessions can share
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS drill_contents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT UNIQUE, -- sha256 of the encoded rows (NULL while being rewritten)
+            refs INTEGER NOT NULL DEFAULT 0 -- sessions using it
+        )
+    ''')
+    c.execute('ALTER TABLE session_steps RENAME COLUMN session_id TO content_id')
+    c.execute('ALTER TABLE session_objects RENAME COLUMN session_id TO content_id')
+    _add_column(c, 'sessions', 'content_id', 'INTEGER')
+    # Row-stored sessions keep their rows: content id = session id
+    c.execute('INSERT INTO drill_contents (id, refs) SELECT id, 1 FROM sessions WHERE data IS NULL')
+    c.execute('UPDATE sessions SET content_id = id WHERE data IS NULL')
+    for (content_id,) in c.execute('SELECT id FROM drill_contents').fetchall():
+        _settle_content(c, content_id)
+
+def _m007_weather_cache(c):
+    # Forecast cache (see Weather Cache)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS weather_cache (
+            loc TEXT NOT NULL, -- 'lat,lon' rounded to 2 decimals (weather.location_key)
+            date TEXT NOT NULL,
+            temp REAL,
+            code INTEGER, -- WMO weather code
+            fetched_at REAL NOT NULL, -- epoch seconds
+            PRIMARY KEY (loc, date)
+        ) WITHOUT ROWID
+    ''')
+
+def _m008_session_venues(c):
+    # Where a session takes place (name + coordinates, for the forecast). NULL = home ground
+    _add_column(c, 'sessions', 'venue_name', 'TEXT')
+    _add_column(c, 'sessions', 'venue_lat', 'REAL')
+    _add_column(c, 'sessions', 'venue_lon', 'REAL')
+
+def _m009_perf_import_ids(c):
+    # Where an imported log came from: (import id, record index in that import). Re-importing
+    # the same export hits the unique index instead of adding its rows again
+    _add_column(c, 'performance_logs', 'import_id', 'TEXT')
+    _add_column(c, 'performance_logs', 'import_seq', 'INTEGER')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_perf_import ON performance_logs(import_id, import_seq) WHERE import_id IS NOT NULL')
+
+def _m010_content_hash_sums(c):
+    # Content hashes became row digest sums (incremental on save): rehash what is stored
+    ids = [r[0] for r in c.execute('SELECT id FROM drill_contents').fetchall()]
+    c.execute('UPDATE drill_contents SET hash = NULL')
+    for content_id in ids:
+        _settle_content(c, content_id)
+
+def _m011_sessions_content_index(c):
+    # Moving a drill's sessions onto identical content (_settle_content) looks them up by content id
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sessions_content ON sessions(content_id)')
+
+def _m012_drop_perf_log_index(c):
+    # Trend reads moved to perf_rollups and imports no longer look up equal logs: the covering index
+    # from _m004 only slowed down every insert (re-imports use idx_perf_import)
+    c.execute('DROP INDEX IF EXISTS idx_perf_user_metric_date')
+
+MIGRATIONS = [
+    _m001_base_tables,
+    _m002_session_rows,
+    _m003_editor_journal,
+    _m004_indexes,
+    _m005_perf_rollups,
+    _m006_drill_contents,
+    _m007_weather_cache,
+    _m008_session_venues,
+    _m009_perf_import_ids,
+    _m010_content_hash_sums,
+    _m011_sessions_content_index,
+    _m012_drop_perf_log_index,
+]
+
+def schema_version():
+    return get_conn().execute('PRAGMA user_version').fetchone()[0]
+
+def init_db():
+    # Fast path: schema is current -> one pragma read
+    if schema_version() >= len(MIGRATIONS): return
+    with transaction() as c:
+        # Re-read under the write lock (another app instance may have just migrated)
+        version = c.execute('PRAGMA user_version').fetchone()[0]
+        for i in range(version, len(MIGRATIONS)):
+            MIGRATIONS[i](c)
+            print(f"DB migration {i + 1}: {MIGRATIONS[i].__name__}")
+        c.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def create_user(username, password, role='player', team_name="My Team", coach_username=None):
+def create_user(username, password, role='player', team_name="My Team", coach_username=None, status=None):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        pwd_hash = hash_password(password)
-        
-        # Determine status
-        status = 'APPROVED' if role == 'coach' else 'PENDING'
-        
-        # Find coach_id and coach team name if provided
-        coach_id = None
-        final_team_name = team_name
-        if coach_username:
-            c.execute('SELECT id, team_name FROM users WHERE username = ? AND role = "coach"', (coach_username,))
-            res = c.fetchone()
-            if res: 
-                coach_id = res[0]
-                final_team_name = res[1] # Inherit team name
-            else: return False, f"Coach '{coach_username}' not found"
-
-        c.execute('INSERT INTO users (username, password_hash, role, status, parent_coach_id, team_name) VALUES (?, ?, ?, ?, ?, ?)', 
-                  (username, pwd_hash, role, status, coach_id, final_team_name))
-        conn.commit()
-        conn.close()
+        with transaction() as c:
+            pwd_hash = hash_password(password)
+            
+            # Determine status (coaches adding a player directly can pass status='APPROVED')
+            if status is None:
+                status = 'APPROVED' if role == 'coach' else 'PENDING'
+            
+            # Find coach_id and coach team name if provided
+            coach_id = None
+            final_team_name = team_name
+            if coach_username:
+                c.execute("SELECT id, team_name FROM users WHERE username = ? AND role = 'coach'", (coach_username,))
+                res = c.fetchone()
+                if res: 
+                    coach_id = res[0]
+                    final_team_name = res[1] # Inherit team name
+                else: return False, f"Coach '{coach_username}' not found"
+
+            c.execute('INSERT INTO users (username, password_hash, role, status, parent_coach_id, team_name) VALUES (?, ?, ?, ?, ?, ?)', 
+                      (username, pwd_hash, role, status, coach_id, final_team_name))
         return True, "User created successfully"
     except sqlite3.IntegrityError:
         return False, "Username already exists"
@@ -113,12 +319,8 @@ def create_user(username, password, role='player', team_name="My Team", coach_us
         return False, str(e)
 
 def verify_user(username, password):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
     pwd_hash = hash_password(password)
-    c.execute('SELECT id, username, team_name, role, status FROM users WHERE username = ? AND password_hash = ?', (username, pwd_hash))
-    user = c.fetchone()
-    conn.close()
+    user = get_conn().execute('SELECT id, username, team_name, role, status FROM users WHERE username = ? AND password_hash = ?', (username, pwd_hash)).fetchone()
     
     if user:
         if user[4] == 'PENDING':
@@ -133,97 +335,203 @@ def verify_user(username, password):
     return None
 
 def approve_player(player_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('UPDATE users SET status = "APPROVED" WHERE id = ?', (player_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("UPDATE users SET status = 'APPROVED' WHERE id = ?", (player_id,))
 
 # --- Notifications ---
 
 def create_notification(target_id, from_id, title, msg):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('INSERT INTO notifications (target_user_id, from_user_id, title, message) VALUES (?, ?, ?, ?)', 
-              (target_id, from_id, title, msg))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('INSERT INTO notifications (target_user_id, from_user_id, title, message) VALUES (?, ?, ?, ?)', 
+                  (target_id, from_id, title, msg))
 
 def get_notifications(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM notifications WHERE target_user_id = ? ORDER BY created_at DESC', (user_id,))
-    res = [dict(r) for r in c.fetchall()]
-    conn.close()
-    return res
+    rows = get_conn().execute('SELECT * FROM notifications WHERE target_user_id = ? ORDER BY created_at DESC', (user_id,))
+    return [dict(r) for r in rows]
 
 def mark_read(notif_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('UPDATE notifications SET is_read = 1 WHERE id = ?', (notif_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('UPDATE notifications SET is_read = 1 WHERE id = ?', (notif_id,))
 
 # --- Performance & Analytics ---
 
 def log_performance(user_id, metric_id, value, date=None):
     if not date: date = datetime.date.today().strftime("%Y-%m-%d")
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('INSERT INTO performance_logs (user_id, date, metric_id, value) VALUES (?, ?, ?, ?)', 
-              (user_id, date, metric_id, value))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('INSERT INTO performance_logs (user_id, date, metric_id, value) VALUES (?, ?, ?, ?)', 
+                  (user_id, date, metric_id, value))
+
+# --- Bulk Performance Import ---
+# For GPS / stopwatch exports: thousands of (user, date, metric, value) records per session.
+# Records are validated, then inserted with executemany in chunked transactions. Samples repeat
+# values all the time, so equal records are never merged: every valid record is a log. Only with
+# an import_id (e.g. file_import_id(path)) are records identified, by (import_id, position in the
+# input), so importing the same export again skips exactly the rows it already added.
+
+PERF_CHUNK = 5000 # Rows per transaction
+
+_PERF_INSERT = '''
+    INSERT OR IGNORE INTO performance_logs (user_id, date, metric_id, value, import_id, import_seq)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+def file_import_id(path):
+    # Identifies an export by its content, so a renamed copy is still the same import
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return "file:" + h.hexdigest()
+
+def _clean_perf_record(rec, user_ids, usernames):
+    # -> (user_id, date, metric_id, value), or None if the record is unusable
+    try:
+        user, date, metric, value = rec
+        if isinstance(user, str) and not user.strip().isdigit():
+            user_id = usernames.get(user.strip()) # Exports may name players instead of ids
+        else:
+            user_id = int(user)
+        if user_id not in user_ids: return None
+        if isinstance(date, (datetime.date, datetime.datetime)):
+            date = date.strftime("%Y-%m-%d")
+        else:
+            date = datetime.date.fromisoformat(str(date).strip()[:10]).strftime("%Y-%m-%d")
+        metric = str(metric).strip().lower()
+        value = float(value)
+        if not metric or not math.isfinite(value): return None
+        return (user_id, date, metric, value)
+    except (TypeError, ValueError):
+        return None
+
+def import_performance(records, chunk_size=PERF_CHUNK, import_id=None):
+    """
+    Bulk-insert performance records from any iterable (list, generator, csv rows).
+    Each record is (user_id or username, date, metric_id, value).
+    import_id: stable id of the source (see file_import_id); records already stored under it
+    are counted as duplicates. Without one nothing is skipped.
+    Returns {'read', 'inserted', 'invalid', 'duplicates', 'seconds', 'rows_per_sec'}.
+    """
+    start = time.perf_counter()
+    conn = get_conn()
+    users = conn.execute('SELECT id, username FROM users').fetchall()
+    user_ids = {r[0] for r in users}
+    usernames = {r[1]: r[0] for r in users}
+    
+    stats = {'read': 0, 'inserted': 0, 'invalid': 0, 'duplicates': 0}
+    chunk = []
+    
+    def write(rows):
+        with transaction() as c:
+            c.executemany(_PERF_INSERT, rows)
+            stats['inserted'] += c.rowcount
+            stats['duplicates'] += len(rows) - c.rowcount
+    
+    for seq, rec in enumerate(records):
+        stats['read'] += 1
+        row = _clean_perf_record(rec, user_ids, usernames)
+        if row is None:
+            stats['invalid'] += 1
+            continue
+        # seq counts invalid records too, so it is the same on every import of the same input
+        chunk.append(row + ((import_id, seq) if import_id else (None, None)))
+        if len(chunk) >= chunk_size:
+            write(chunk)
+            chunk = []
+    if chunk: write(chunk)
+    
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_sec'] = stats['read'] / stats['seconds'] if stats['seconds'] else 0.0
+    print(f"Performance import: {stats['inserted']} inserted, {stats['duplicates']} duplicates, "
+          f"{stats['invalid']} invalid ({stats['rows_per_sec']:.0f} rows/s)")
+    return stats
+
+def read_performance_csv(path):
+    """Stream records from a CSV with a header: user_id (or username), date, metric_id (or metric), value."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            user = row.get('user_id') or row.get('username')
+            metric = row.get('metric_id') or row.get('metric')
+            yield (user, row.get('date'), metric, row.get('value'))
+
+# Rollups: perf_rollups holds count/sum/min/max per (player or team, metric, day or week),
+# updated by trg_perf_rollups on every insert. Readers touch a few buckets instead of raw logs.
+# A team's rows belong to the player's coach at the time the value was logged.
+
+PERF_WEEK_BUCKET = "date({col}, 'weekday 0', '-6 days')" # Monday of the week
+
+def _rebuild_perf_rollups(c):
+    c.execute('DELETE FROM perf_rollups')
+    for period, bucket in (('day', '{col}'), ('week', PERF_WEEK_BUCKET)):
+        c.execute(f'''
+            INSERT INTO perf_rollups
+            SELECT 'player', user_id, metric_id, '{period}', {bucket.format(col='date')} AS b, COUNT(*), SUM(value), MIN(value), MAX(value)
+            FROM performance_logs GROUP BY user_id, metric_id, b
+        ''')
+        c.execute(f'''
+            INSERT INTO perf_rollups
+            SELECT 'team', u.parent_coach_id, p.metric_id, '{period}', {bucket.format(col='p.date')} AS b, COUNT(*), SUM(p.value), MIN(p.value), MAX(p.value)
+            FROM performance_logs p JOIN users u ON p.user_id = u.id
+            WHERE u.parent_coach_id IS NOT NULL GROUP BY u.parent_coach_id, p.metric_id, b
+        ''')
+
+def rebuild_perf_rollups():
+    """Recompute every rollup from performance_logs (after deleting or editing logs by hand)."""
+    with transaction() as c:
+        _rebuild_perf_rollups(c)
+
+def get_perf_rollup(scope, owner_id, metric_id, period='day', start=None, end=None):
+    """Buckets for one player/team and metric, oldest first: [{'bucket', 'count', 'sum', 'min', 'max', 'avg'}, ...]"""
+    rows = get_conn().execute('''
+        SELECT bucket, n, total, min_value, max_value FROM perf_rollups
+        WHERE scope = ? AND owner_id = ? AND metric_id = ? AND period = ? AND bucket BETWEEN ? AND ?
+        ORDER BY bucket
+    ''', (scope, owner_id, metric_id, period, start or '0000-00-00', end or '9999-99-99'))
+    return [{'bucket': r[0], 'count': r[1], 'sum': r[2], 'min': r[3], 'max': r[4], 'avg': r[2] / r[1]} for r in rows]
+
+def get_perf_log_count(scope, owner_id, metric_id, start, end):
+    # Number of logs behind a series (changes whenever a log is added; used as a cache stamp)
+    return get_conn().execute('''
+        SELECT COALESCE(SUM(n), 0) FROM perf_rollups
+        WHERE scope = ? AND owner_id = ? AND metric_id = ? AND period = 'day' AND bucket BETWEEN ? AND ?
+    ''', (scope, owner_id, metric_id, start, end)).fetchone()[0]
+
+def get_perf_metrics(scope, owner_id):
+    rows = get_conn().execute("SELECT DISTINCT metric_id FROM perf_rollups WHERE scope = ? AND owner_id = ? ORDER BY metric_id", (scope, owner_id))
+    return [r[0] for r in rows]
 
 def get_performance_data(user_id, metric_id, limit=10):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT date, value FROM performance_logs WHERE user_id = ? AND metric_id = ? ORDER BY date ASC LIMIT ?', 
-              (user_id, metric_id, limit))
-    res = [dict(r) for r in c.fetchall()]
-    conn.close()
-    return res
+    # Latest `limit` days, oldest first; value is the day's average
+    rows = get_conn().execute('''
+        SELECT bucket AS date, total / n AS value, min_value, max_value, n FROM perf_rollups
+        WHERE scope = 'player' AND owner_id = ? AND metric_id = ? AND period = 'day'
+        ORDER BY bucket DESC LIMIT ?
+    ''', (user_id, metric_id, limit))
+    return [dict(r) for r in reversed(rows.fetchall())]
 
 def get_team_average(coach_id, metric_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        SELECT AVG(value) FROM performance_logs 
-        JOIN users ON performance_logs.user_id = users.id 
-        WHERE users.parent_coach_id = ? AND metric_id = ?
-    ''', (coach_id, metric_id))
-    avg = c.fetchone()[0]
-    conn.close()
+    # Weekly buckets: one row per week of history instead of every log
+    avg = get_conn().execute('''
+        SELECT SUM(total) / SUM(n) FROM perf_rollups
+        WHERE scope = 'team' AND owner_id = ? AND metric_id = ? AND period = 'week'
+    ''', (coach_id, metric_id)).fetchone()[0]
     return avg or 0
 
 def get_pending_players(coach_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT id, username, team_name FROM users WHERE parent_coach_id = ? AND status = "PENDING"', (coach_id,))
-    res = [dict(r) for r in c.fetchall()]
-    conn.close()
-    return res
+    rows = get_conn().execute("SELECT id, username, team_name FROM users WHERE parent_coach_id = ? AND status = 'PENDING'", (coach_id,))
+    return [dict(r) for r in rows]
 
 def get_team_players(coach_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT id, username, team_name FROM users WHERE parent_coach_id = ? AND status = "APPROVED"', (coach_id,))
-    res = [dict(r) for r in c.fetchall()]
-    conn.close()
-    return res
+    rows = get_conn().execute("SELECT id, username, team_name FROM users WHERE parent_coach_id = ? AND status = 'APPROVED'", (coach_id,))
+    return [dict(r) for r in rows]
 
 def delete_all_users():
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM users')
-        c.execute('DELETE FROM sessions') # Clear sessions too
-        conn.commit()
-        conn.close()
+        with transaction() as c:
+            c.execute('DELETE FROM users')
+            c.execute('DELETE FROM sessions') # Clear sessions too
+            c.execute('DELETE FROM session_steps')
+            c.execute('DELETE FROM session_objects')
+            c.execute('DELETE FROM drill_contents')
         print("All users and sessions deleted successfully.")
         return True
     except Exception as e:
@@ -232,63 +540,350 @@ def delete_all_users():
 
 # --- Session Management ---
 
-def create_session(user_id, title, date, time, status, data_dict):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    # Serialize data
-    data_json = json.dumps(data_dict)
-    c.execute('INSERT INTO sessions (user_id, title, date, time, status, data) VALUES (?, ?, ?, ?, ?, ?)',
-              (user_id, title, date, time, status, data_json))
-    conn.commit()
-    conn.close()
+# Session content is stored as a header row (sessions) plus append-only rows:
+#   session_steps   (content_id, step_idx) -> one animation frame
+#   session_objects (content_id, kind, ord) -> one player / text label
+# Saving only touches the rows that changed. Legacy rows keep their JSON blob in
+# sessions.data until they are saved once (data is set to NULL afterwards).
+# Row data is the compact binary format from payload.py; rows written before it are JSON and still read.
+#
+# Content is addressed by the hash of its rows (drill_contents). Sessions with the same drill
+# share one content id, so repeating a drill across weeks or teams only adds a sessions row.
+# Editing shared content copies its rows first (copy-on-write); after every write the hash is
+# updated and, if that content already exists, the session moves onto it.
+# The hash is the sum (mod 2**256) of one sha256 per row, each covering the row's position and
+# data, so a save subtracts the digests of the rows it replaces or deletes and adds those it
+# writes: its cost follows the size of the edit, not of the drill.
+OBJECT_KINDS = ('players', 'text_labels')
+
+def _dump(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+HASH_MOD = 1 << 256
+
+def _row_digest(tag, pos, d):
+    h = hashlib.sha256(tag)
+    h.update(pos.to_bytes(4, 'little'))
+    h.update(d if isinstance(d, bytes) else d.encode())
+    return int.from_bytes(h.digest(), 'big')
+
+def _step_digest(idx, d):
+    return _row_digest(b'S\0', idx, d)
+
+def _object_digest(kind, ord_, d):
+    return _row_digest(kind.encode() + b'\0', ord_, d)
+
+def _write_session_rows(c, content_id, step_start, new_steps, changed_objects, object_counts):
+    """Apply a delta. Returns the change to the content's hash sum (see _content_sum)."""
+    delta = 0
+    # Steps: drop anything from step_start on (undo / edited tail), then append
+    for idx, d in c.execute('SELECT step_idx, data FROM session_steps WHERE content_id = ? AND step_idx >= ?', (content_id, step_start)).fetchall():
+        delta -= _step_digest(idx, d)
+    c.execute('DELETE FROM session_steps WHERE content_id = ? AND step_idx >= ?', (content_id, step_start))
+    rows = [(content_id, step_start + i, payload.encode(f)) for i, f in enumerate(new_steps)]
+    c.executemany('INSERT INTO session_steps (content_id, step_idx, data) VALUES (?, ?, ?)', rows)
+    delta += sum(_step_digest(idx, d) for _, idx, d in rows)
+    # Objects: upsert changed slots, trim removed ones
+    removed = {}
+    for kind, i, _ in changed_objects:
+        row = c.execute('SELECT data FROM session_objects WHERE content_id = ? AND kind = ? AND ord = ?', (content_id, kind, i)).fetchone()
+        if row: removed[(kind, i)] = row[0]
+    for kind, n in object_counts.items():
+        for i, d in c.execute('SELECT ord, data FROM session_objects WHERE content_id = ? AND kind = ? AND ord >= ?', (content_id, kind, n)).fetchall():
+            removed[(kind, i)] = d
+    delta -= sum(_object_digest(kind, i, d) for (kind, i), d in removed.items())
+    rows = [(content_id, kind, i, payload.encode(d)) for kind, i, d in changed_objects]
+    c.executemany('INSERT OR REPLACE INTO session_objects (content_id, kind, ord, data) VALUES (?, ?, ?, ?)', rows)
+    for kind, n in object_counts.items():
+        c.execute('DELETE FROM session_objects WHERE content_id = ? AND kind = ? AND ord >= ?', (content_id, kind, n))
+    delta += sum(_object_digest(kind, i, d) for _, kind, i, d in rows if i < object_counts.get(kind, i + 1))
+    return delta
+
+def _full_rows(data_dict):
+    # Everything in data_dict as a delta from an empty session
+    changed = [(kind, i, d) for kind in OBJECT_KINDS for i, d in enumerate(data_dict.get(kind, []))]
+    counts = {kind: len(data_dict.get(kind, [])) for kind in OBJECT_KINDS}
+    return data_dict.get('frames', []), changed, counts
+
+def _read_session_rows(c, content_id):
+    data = {kind: [] for kind in OBJECT_KINDS}
+    c.execute('SELECT data FROM session_steps WHERE content_id = ? ORDER BY step_idx', (content_id,))
+    data['frames'] = [payload.decode(r[0]) for r in c.fetchall()]
+    c.execute('SELECT kind, data FROM session_objects WHERE content_id = ? ORDER BY kind, ord', (content_id,))
+    for kind, d in c.fetchall():
+        data.setdefault(kind, []).append(payload.decode(d))
+    return data
+
+def _content_sum(c, content_id):
+    # Full recomputation (migrations, or content without a stored hash)
+    total = 0
+    for idx, d in c.execute('SELECT step_idx, data FROM session_steps WHERE content_id = ?', (content_id,)):
+        total += _step_digest(idx, d)
+    for kind, i, d in c.execute('SELECT kind, ord, data FROM session_objects WHERE content_id = ?', (content_id,)):
+        total += _object_digest(kind, i, d)
+    return total
+
+def _stored_sum(c, content_id):
+    row = c.execute('SELECT hash FROM drill_contents WHERE id = ?', (content_id,)).fetchone()
+    return int(row[0], 16) if row and row[0] else _content_sum(c, content_id)
+
+def _release_content(c, content_id):
+    # One session fewer; drop the rows once nobody uses them
+    c.execute('UPDATE drill_contents SET refs = refs - 1 WHERE id = ?', (content_id,))
+    if c.execute('SELECT refs FROM drill_contents WHERE id = ?', (content_id,)).fetchone()[0] <= 0:
+        c.execute('DELETE FROM session_steps WHERE content_id = ?', (content_id,))
+        c.execute('DELETE FROM session_objects WHERE content_id = ?', (content_id,))
+        c.execute('DELETE FROM drill_contents WHERE id = ?', (content_id,))
+
+def _settle_content(c, content_id, total=None):
+    """Store the content's hash (total: its row digest sum, computed if None); if identical content
+    exists, move its users there. Returns the content id to use."""
+    if total is None: total = _content_sum(c, content_id)
+    digest = f"{total % HASH_MOD:064x}"
+    row = c.execute('SELECT id FROM drill_contents WHERE hash = ? AND id != ?', (digest, content_id)).fetchone()
+    if row:
+        refs = c.execute('SELECT refs FROM drill_contents WHERE id = ?', (content_id,)).fetchone()[0]
+        c.execute('UPDATE sessions SET content_id = ? WHERE content_id = ?', (row[0], content_id))
+        c.execute('UPDATE drill_contents SET refs = refs + ? WHERE id = ?', (refs, row[0]))
+        c.execute('UPDATE drill_contents SET refs = 0 WHERE id = ?', (content_id,))
+        _release_content(c, content_id)
+        return row[0]
+    c.execute('UPDATE drill_contents SET hash = ? WHERE id = ?', (digest, content_id))
+    return content_id
+
+def _new_content(c, copy_from=None):
+    c.execute('INSERT INTO drill_contents (refs) VALUES (1)')
+    content_id = c.lastrowid
+    if copy_from is not None:
+        c.execute('INSERT INTO session_steps SELECT ?, step_idx, data FROM session_steps WHERE content_id = ?', (content_id, copy_from))
+        c.execute('INSERT INTO session_objects SELECT ?, kind, ord, data FROM session_objects WHERE content_id = ?', (content_id, copy_from))
+    return content_id
+
+def create_session(user_id, title, date, time, status, data_dict, venue=None):
+    # venue: (name, lat, lon) or None for the home ground
+    name, lat, lon = venue or (None, None, None)
+    with transaction() as c:
+        content_id = _new_content(c)
+        steps, changed, counts = _full_rows(data_dict)
+        total = _write_session_rows(c, content_id, 0, steps, changed, counts)
+        c.execute('INSERT INTO sessions (user_id, title, date, time, status, note, content_id, venue_name, venue_lat, venue_lon) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                  (user_id, title, date, time, status, data_dict.get('note', ""), content_id, name, lat, lon))
+        session_id = c.lastrowid
+        _settle_content(c, content_id, total) # Same drill already stored -> share it
+    return session_id
+
+def duplicate_session(session_id, date, time=None, title=None):
+    """Schedule the same drill again (another week/team): one sessions row, no content copy."""
+    with transaction() as c:
+        c.execute('SELECT user_id, title, time, note, content_id, data, venue_name, venue_lat, venue_lon FROM sessions WHERE id = ?', (session_id,))
+        src = c.fetchone()
+        if not src: return None
+        content_id = src['content_id']
+        if content_id is not None: # Legacy blob (None): nothing shared yet, the blob is copied
+            c.execute('UPDATE drill_contents SET refs = refs + 1 WHERE id = ?', (content_id,))
+        c.execute('INSERT INTO sessions (user_id, title, date, time, status, data, note, content_id, venue_name, venue_lat, venue_lon) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                  (src['user_id'], title or src['title'], date, time or src['time'], "UPCOMING",
+                   src['data'] if content_id is None else None, src['note'], content_id,
+                   src['venue_name'], src['venue_lat'], src['venue_lon']))
+        return c.lastrowid
+
+def save_session_delta(session_id, step_start, new_steps, changed_objects, object_counts, title=None, time=None, note=None, venue=None):
+    """
+    Incremental save in one transaction.
+    step_start: first step index that differs from what is stored; new_steps replace steps[step_start:]
+    changed_objects: [(kind, ord, dict), ...] for slots that changed; object_counts: {kind: count}
+    venue: (name, lat, lon) to move the session, None to keep it
+    """
+    with transaction() as c:
+        row = c.execute('SELECT content_id FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        if not row: return
+        content_id = row[0]
+        if content_id is None:
+            content_id = _new_content(c) # Legacy blob: the delta is the whole drill
+            total = 0
+        else:
+            total = _stored_sum(c, content_id) # The copy below has the same rows, so the same sum
+            refs = c.execute('SELECT refs FROM drill_contents WHERE id = ?', (content_id,)).fetchone()[0]
+            if refs > 1: # Shared: copy before writing
+                old = content_id
+                content_id = _new_content(c, copy_from=old)
+                _release_content(c, old)
+        c.execute('UPDATE drill_contents SET hash = NULL WHERE id = ?', (content_id,))
+        c.execute('UPDATE sessions SET data = NULL, content_id = ?, title = COALESCE(?, title), time = COALESCE(?, time), note = COALESCE(?, note) WHERE id = ?',
+                  (content_id, title, time, note, session_id))
+        if venue:
+            c.execute('UPDATE sessions SET venue_name = ?, venue_lat = ?, venue_lon = ? WHERE id = ?', (*venue, session_id))
+        total += _write_session_rows(c, content_id, step_start, new_steps, changed_objects, object_counts)
+        _settle_content(c, content_id, total)
 
 def update_session(session_id, data_dict, title=None, time=None):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    data_json = json.dumps(data_dict)
-    if title and time:
-        c.execute('UPDATE sessions SET data = ?, title = ?, time = ? WHERE id = ?', (data_json, title, time, session_id))
-    elif title:
-        c.execute('UPDATE sessions SET data = ?, title = ? WHERE id = ?', (data_json, title, session_id))
-    elif time:
-        c.execute('UPDATE sessions SET data = ?, time = ? WHERE id = ?', (data_json, time, session_id))
-    else:
-        c.execute('UPDATE sessions SET data = ? WHERE id = ?', (data_json, session_id))
-    conn.commit()
-    conn.close()
+    # Full rewrite (callers without a delta)
+    steps, changed, counts = _full_rows(data_dict)
+    save_session_delta(session_id, 0, steps, changed, counts, title or None, time or None, data_dict.get('note'))
 
-def get_user_sessions(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    # Check if user is player
+SESSION_META_COLUMNS = 'id, user_id, title, date, time, status, assigned_to_id, venue_name, venue_lat, venue_lon'
+
+def _session_owner(c, user_id):
+    # Players see their coach's sessions
     c.execute('SELECT role, parent_coach_id FROM users WHERE id = ?', (user_id,))
     u = c.fetchone()
-    target_id = user_id
-    if u and u['role'] == 'player' and u['parent_coach_id']:
-        target_id = u['parent_coach_id']
+    if u and u[0] == 'player' and u[1]:
+        return u[1]
+    return user_id
 
-    c.execute('SELECT * FROM sessions WHERE user_id = ? ORDER BY date DESC', (target_id,))
-    rows = c.fetchall()
-    conn.close()
-    
-    sessions = []
-    for r in rows:
-        sess = dict(r)
-        try:
-            sess['data'] = json.loads(sess['data'])
-        except:
-            sess['data'] = {}
-        sessions.append(sess)
-    return sessions
+def get_user_sessions(user_id):
+    """Session list for the dashboard: metadata only (no payload). Use get_session_data() to open one."""
+    c = get_conn().cursor()
+    target_id = _session_owner(c, user_id)
+    c.execute(f'SELECT {SESSION_META_COLUMNS} FROM sessions WHERE user_id = ? ORDER BY date DESC', (target_id,))
+    return [dict(r) for r in c.fetchall()]
+
+def get_sessions_in_range(user_id, start_date, end_date):
+    """Metadata for sessions with start_date <= date <= end_date ('YYYY-MM-DD'), served by idx_sessions_user_date."""
+    c = get_conn().cursor()
+    target_id = _session_owner(c, user_id)
+    c.execute(f'SELECT {SESSION_META_COLUMNS} FROM sessions WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date, time',
+              (target_id, start_date, end_date))
+    return [dict(r) for r in c.fetchall()]
+
+def get_session_data(session_id):
+    """Drill payload {'players', 'frames', 'text_labels', 'note', ...} for one session, loaded on demand."""
+    c = get_conn().cursor()
+    c.execute('SELECT data, note, content_id FROM sessions WHERE id = ?', (session_id,))
+    row = c.fetchone()
+    if not row:
+        return {}
+    legacy_json, note, content_id = row
+    # An unreadable drill (corrupt row or blob) loads as empty instead of failing the caller
+    try:
+        if legacy_json is None:
+            data = _read_session_rows(c, content_id)
+            data['note'] = note or ""
+            data['storage'] = 'rows'
+        else:
+            data = payload.decode(legacy_json)
+    except ValueError as e:
+        print(f"Session {session_id}: unreadable drill data ({e})")
+        data = {}
+    return data
+
+def get_content_hash(session_id):
+    """Identifies a session's drill content (equal for sessions sharing a drill); None if the session is gone."""
+    row = get_conn().execute('SELECT s.data, d.hash FROM sessions s LEFT JOIN drill_contents d ON d.id = s.content_id WHERE s.id = ?',
+                             (session_id,)).fetchone()
+    if not row: return None
+    legacy, content_hash = row
+    if legacy is not None:
+        return hashlib.sha256(legacy.encode() if isinstance(legacy, str) else legacy).hexdigest()
+    return content_hash
 
 def delete_session(session_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        row = c.execute('SELECT content_id FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        c.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+        if row and row[0] is not None:
+            _release_content(c, row[0])
+
+# --- Autosave Journal ---
+
+def append_journal(session_key, records):
+    # One transaction for the whole batch
+    if not records: return
+    with transaction() as c:
+        c.executemany('INSERT INTO editor_journal (session_key, op) VALUES (?, ?)',
+                      [(session_key, _dump(r)) for r in records])
+
+def get_journal(session_key):
+    rows = get_conn().execute('SELECT op FROM editor_journal WHERE session_key = ? ORDER BY id ASC', (session_key,)).fetchall()
+    records = []
+    for (op,) in rows:
+        try:
+            records.append(json.loads(op))
+        except ValueError:
+            break # Torn write at the tail: keep what we have
+    return records
+
+def get_editor_state(session_id, journal_key):
+    """What the editor needs before its first frame: (drill payload, or None for a draft; journal records)."""
+    return (get_session_data(session_id) if session_id else None), get_journal(journal_key)
+
+def clear_journal(session_key):
+    with transaction() as c:
+        c.execute('DELETE FROM editor_journal WHERE session_key = ?', (session_key,))
+
+# --- Weather Cache ---
+
+def get_weather(loc, from_date):
+    """Cached forecast for one location: ({date: {'temp', 'code'}}, oldest fetched_at or None)."""
+    rows = get_conn().execute('SELECT date, temp, code, fetched_at FROM weather_cache WHERE loc = ? AND date >= ? ORDER BY date',
+                              (loc, from_date)).fetchall()
+    forecast = {r[0]: {'temp': r[1], 'code': r[2]} for r in rows}
+    return forecast, (min(r[3] for r in rows) if rows else None)
+
+def put_weather(loc, forecast, fetched_at, keep_from):
+    # forecast: {date: {'temp', 'code'}}; days before keep_from are dropped
+    put_weather_many({loc: forecast}, fetched_at, keep_from)
+
+def put_weather_many(forecasts, fetched_at, keep_from):
+    # {loc: forecast} from one batched fetch, in one transaction
+    with transaction() as c:
+        for loc, forecast in forecasts.items():
+            c.execute('DELETE FROM weather_cache WHERE loc = ? AND date < ?', (loc, keep_from))
+            c.executemany('INSERT OR REPLACE INTO weather_cache (loc, date, temp, code, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                          [(loc, d, f['temp'], f['code'], fetched_at) for d, f in forecast.items()])
+
+# --- Query Plan Check ---
+# Every hot query with representative parameters. check_query_plans() runs
+# EXPLAIN QUERY PLAN on each and reports any full table scan, so a dropped or
+# unusable index shows up immediately (run: python database.py).
+
+HOT_QUERIES = {
+    'get_user_sessions': (f'SELECT {SESSION_META_COLUMNS} FROM sessions WHERE user_id = ? ORDER BY date DESC', (1,)),
+    'get_sessions_in_range': (f'SELECT {SESSION_META_COLUMNS} FROM sessions WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date, time', (1, '2026-01-05', '2026-01-11')),
+    'get_notifications': ('SELECT * FROM notifications WHERE target_user_id = ? ORDER BY created_at DESC', (1,)),
+    'get_performance_data': ("SELECT bucket, total / n FROM perf_rollups WHERE scope = 'player' AND owner_id = ? AND metric_id = ? AND period = 'day' ORDER BY bucket DESC LIMIT ?", (1, 'speed', 10)),
+    'get_team_average': ("SELECT SUM(total) / SUM(n) FROM perf_rollups WHERE scope = 'team' AND owner_id = ? AND metric_id = ? AND period = 'week'", (1, 'speed')),
+    'get_perf_rollup': ('SELECT bucket, n, total, min_value, max_value FROM perf_rollups WHERE scope = ? AND owner_id = ? AND metric_id = ? AND period = ? AND bucket BETWEEN ? AND ? ORDER BY bucket', ('player', 1, 'speed', 'day', '2026-01-01', '2026-03-31')),
+    'get_pending_players': ("SELECT id, username, team_name FROM users WHERE parent_coach_id = ? AND status = 'PENDING'", (1,)),
+    'get_team_players': ("SELECT id, username, team_name FROM users WHERE parent_coach_id = ? AND status = 'APPROVED'", (1,)),
+    'session_steps': ('SELECT data FROM session_steps WHERE content_id = ? ORDER BY step_idx', (1,)),
+    'session_objects': ('SELECT kind, data FROM session_objects WHERE content_id = ? ORDER BY kind, ord', (1,)),
+    'drill_contents_hash': ('SELECT id FROM drill_contents WHERE hash = ? AND id != ?', ('0' * 64, 1)),
+    'settle_content': ('UPDATE sessions SET content_id = ? WHERE content_id = ?', (2, 1)),
+    'get_perf_log_count': ("SELECT COALESCE(SUM(n), 0) FROM perf_rollups WHERE scope = ? AND owner_id = ? AND metric_id = ? AND period = 'day' AND bucket BETWEEN ? AND ?", ('team', 1, 'speed', '2026-01-01', '2026-03-31')),
+    'get_perf_metrics': ("SELECT DISTINCT metric_id FROM perf_rollups WHERE scope = ? AND owner_id = ? ORDER BY metric_id", ('team', 1)),
+    'get_weather': ('SELECT date, temp, code, fetched_at FROM weather_cache WHERE loc = ? AND date >= ? ORDER BY date', ('32.09,34.78', '2026-01-05')),
+    'get_journal': ('SELECT op FROM editor_journal WHERE session_key = ? ORDER BY id ASC', ('session:1',)),
+}
+
+def explain_query_plans():
+    # {name: [plan detail, ...]}
+    conn = get_conn()
+    return {name: [r[3] for r in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+            for name, (sql, params) in HOT_QUERIES.items()}
+
+def check_query_plans():
+    """Names of hot queries whose plan contains a full table scan ('SCAN <table>' without an index)."""
+    bad = []
+    for name, plan in explain_query_plans().items():
+        if any(d.startswith('SCAN') and 'INDEX' not in d for d in plan):
+            bad.append(name)
+    return bad
 
 # Initialize on import
 init_db()
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) == 3 and sys.argv[1] == 'import':
+        # python database.py import export.csv
+        import_performance(read_performance_csv(sys.argv[2]), import_id=file_import_id(sys.argv[2]))
+        raise SystemExit(0)
+    for name, plan in explain_query_plans().items():
+        print(f"{name}:")
+        for d in plan: print(f"    {d}")
+    scans = check_query_plans()
+    if scans:
+        print(f"FULL TABLE SCAN: {', '.join(scans)}")
+        raise SystemExit(1)
+    print("All hot queries use an index.")
@@ -0,0 +1,94 @@
+import threading
+import queue
+
+# Background database worker.
+# Scenes never call database.* from the frame loop: they submit the call here and get
+# a DBFuture back. One thread runs the calls in submission order (so a save followed by
+# a reload always sees the save), and finished futures are handed back to the main loop,
+# which runs their callbacks in SceneManager.run via worker.dispatch().
+
+
+class DBFuture:
+    def __init__(self):
+        self.done = False
+        self.result = None
+        self.error = None
+        self.callbacks = []
+
+    def then(self, on_done, on_error=None):
+        """Run on_done(result) (or on_error(exc)) on the main loop once the call finishes."""
+        self.callbacks.append((on_done, on_error))
+        if self.done: worker.put_ready(self) # Already finished: deliver on the next dispatch
+        return self
+
+    def fire(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for on_done, on_error in callbacks:
+            try:
+                if self.error is None:
+                    if on_done: on_done(self.result)
+                elif on_error:
+                    on_error(self.error)
+                else:
+                    print(f"DB Error: {self.error}")
+            except Exception as e:
+                print(f"DB Callback Error: {e}")
+
+
+class DBWorker:
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.ready = queue.Queue() # Finished futures waiting for the main loop
+        self.thread = None
+        self.lock = threading.Lock()
+        self.on_ready = None # Called from the worker thread when a result is ready (wakes an idle main loop)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        fut = DBFuture()
+        self.start()
+        self.jobs.put((fn, args, kwargs, fut))
+        return fut
+
+    def run(self):
+        import database
+        while True:
+            job = self.jobs.get()
+            if job is None: break
+            fn, args, kwargs, fut = job
+            try:
+                fut.result = fn(*args, **kwargs)
+            except Exception as e:
+                fut.error = e
+            fut.done = True
+            self.put_ready(fut)
+        database.close_connection()
+
+    def put_ready(self, fut):
+        self.ready.put(fut)
+        if self.on_ready: self.on_ready()
+
+    def dispatch(self):
+        """Main loop: run callbacks of finished calls. Returns how many were delivered."""
+        n = 0
+        while True:
+            try:
+                fut = self.ready.get_nowait()
+            except queue.Empty:
+                return n
+            fut.fire()
+            n += 1
+
+    def stop(self, timeout=5):
+        # Let queued writes finish, then end the thread
+        if self.thread and self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join(timeout)
+
+
+worker = DBWorker()
@@ -34,6 +34,13 @@ class DrillObject:
     def reset_position(self):
         self.pos = self.start_pos.copy()
 
+    def to_dict(self):
+        return {'id': self.id, 'x': self.pos.x, 'y': self.pos.y, 'color': list(self.color), 'stroke': list(self.stroke_color), 'label': self.label, 'type': self.type}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['id'], d['x'], d['y'], tuple(d['color']), tuple(d['stroke']), d['label'], d['type'])
+
     def draw(self, surface, alpha=255):
         sx, sy = projector.to_screen(self.pos.x, self.pos.y)
         dist_scale = 0.6 + self.pos.y * 0.4 if projector.mode == '3D' else 1.0
@@ -172,6 +179,13 @@ class TextObject:
         self.is_hovered = False
         self.render_text()
 
+    def to_dict(self):
+        return {'id': self.id, 'x': self.pos.x, 'y': self.pos.y, 'text': self.text, 'color': list(self.color)}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['id'], d['x'], d['y'], d['text'], tuple(d['color']), d.get('size', 24))
+
     def render_text(self):
         self.text_surf = self.font.render(self.text, True, self.color)
         self.shadow_surf = self.font.render(self.text, True, (20, 20, 20))
@@ -0,0 +1,182 @@
+import pygame
+from collections import deque
+from contextlib import contextmanager
+
+# Undo/Redo for the Editor.
+# Every mutation is recorded as a small inverse-able command instead of a scene snapshot.
+# Commands keep references to the objects/frames they touch (the scene shares them),
+# so a history entry costs a handful of references, not a copy of the drill.
+
+
+class Command:
+    def do(self, scene): pass
+    def undo(self, scene): pass
+
+    def cost(self):
+        # Rough memory units (~ one per retained reference)
+        return 1
+
+    def is_noop(self):
+        return False
+
+
+class Splice(Command):
+    """Replace scene.<attr>[index:index+len(removed)] with inserted (lists: players, arrows, text_labels, frames)."""
+    def __init__(self, attr, index, removed, inserted):
+        self.attr = attr
+        self.index = index
+        self.removed = list(removed)
+        self.inserted = list(inserted)
+
+    def do(self, scene):
+        lst = getattr(scene, self.attr)
+        lst[self.index:self.index + len(self.removed)] = self.inserted
+
+    def undo(self, scene):
+        lst = getattr(scene, self.attr)
+        lst[self.index:self.index + len(self.inserted)] = self.removed
+
+    def cost(self):
+        return 1 + len(self.removed) + len(self.inserted)
+
+    def is_noop(self):
+        return not self.removed and not self.inserted
+
+    # Helpers for the common cases
+    @classmethod
+    def insert(cls, scene, attr, item, index=None):
+        lst = getattr(scene, attr)
+        return cls(attr, len(lst) if index is None else index, [], [item])
+
+    @classmethod
+    def remove(cls, scene, attr, item):
+        lst = getattr(scene, attr)
+        return cls(attr, lst.index(item), [item], [])
+
+    @classmethod
+    def replace_all(cls, scene, attr, new_items):
+        return cls(attr, 0, getattr(scene, attr), new_items)
+
+
+class MoveObjects(Command):
+    """Position change for one or more objects: {obj: (old_xy, new_xy)}."""
+    def __init__(self, moves):
+        self.moves = {o: (tuple(a), tuple(b)) for o, (a, b) in moves.items() if tuple(a) != tuple(b)}
+
+    def do(self, scene):
+        for obj, (_, new) in self.moves.items():
+            obj.pos = pygame.Vector2(new)
+
+    def undo(self, scene):
+        for obj, (old, _) in self.moves.items():
+            obj.pos = pygame.Vector2(old)
+
+    def cost(self):
+        return 1 + 2 * len(self.moves)
+
+    def is_noop(self):
+        return not self.moves
+
+
+class Compound(Command):
+    """Several commands applied as one undo step (e.g. formation = replace players + add step)."""
+    def __init__(self, commands):
+        self.commands = [c for c in commands if not c.is_noop()]
+
+    def do(self, scene):
+        for c in self.commands: c.do(scene)
+
+    def undo(self, scene):
+        for c in reversed(self.commands): c.undo(scene)
+
+    def cost(self):
+        return 1 + sum(c.cost() for c in self.commands)
+
+    def is_noop(self):
+        return not self.commands
+
+
+class CommandHistory:
+    def __init__(self, scene, max_cost=20000, max_depth=300):
+        self.scene = scene
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.total_cost = 0
+        self._group = None
+        self._group_depth = 0
+        # Optional observer: listener(kind, cmd) with kind in 'do', 'undo', 'redo', 'begin', 'end'.
+        # Called right after the change is applied (used by the autosave journal).
+        self.listener = None
+
+    def notify(self, kind, cmd=None):
+        if self.listener: self.listener(kind, cmd)
+
+    def execute(self, cmd):
+        """Apply a command and record it."""
+        if cmd.is_noop(): return
+        cmd.do(self.scene)
+        self.push(cmd)
+
+    def push(self, cmd):
+        """Record a command whose effect is already applied (e.g. end of a drag)."""
+        if cmd.is_noop(): return
+        self.notify('do', cmd)
+        self.store(cmd)
+
+    def store(self, cmd):
+        if self._group is not None:
+            self._group.append(cmd)
+            return
+        self.undo_stack.append(cmd)
+        self.total_cost += cmd.cost()
+        for c in self.redo_stack: self.total_cost -= c.cost()
+        self.redo_stack.clear()
+        self.trim()
+
+    @contextmanager
+    def group(self):
+        # Everything executed inside the block becomes a single undo step
+        if self._group_depth == 0:
+            self._group = []
+            self.notify('begin')
+        self._group_depth += 1
+        try:
+            yield
+        finally:
+            self._group_depth -= 1
+            if self._group_depth == 0:
+                cmds, self._group = self._group, None
+                self.notify('end')
+                if cmds: self.store(cmds[0] if len(cmds) == 1 else Compound(cmds))
+
+    def trim(self):
+        # Drop the oldest entries until we're back inside the memory budget
+        while self.undo_stack and (self.total_cost > self.max_cost or len(self.undo_stack) > self.max_depth):
+            old = self.undo_stack.popleft()
+            self.total_cost -= old.cost()
+
+    def undo(self):
+        if not self.undo_stack: return None
+        cmd = self.undo_stack.pop()
+        cmd.undo(self.scene)
+        self.redo_stack.append(cmd)
+        self.notify('undo', cmd)
+        return cmd
+
+    def redo(self):
+        if not self.redo_stack: return None
+        cmd = self.redo_stack.pop()
+        cmd.do(self.scene)
+        self.undo_stack.append(cmd)
+        self.notify('redo', cmd)
+        return cmd
+
+    def can_undo(self): return bool(self.undo_stack)
+    def can_redo(self): return bool(self.redo_stack)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.total_cost = 0
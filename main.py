@@ -9,12 +9,30 @@ import random
 import database
 import datetime
 import weather
+import thumbnails
 from projection import projector
 from formations import FORMATIONS, get_formation
-from ui_components import Button, SessionCard, InputBox, Sidebar, Dropdown, SidePanel, Slider
+from ui_components import Button, SessionCard, InputBox, Sidebar, Dropdown, SidePanel, Slider, LineChart, dirty, load_icon
+from history import CommandHistory, Splice, MoveObjects, Compound
+from autosave import AutosaveJournal
+from db_worker import worker as db_worker
+import analytics
+from contextlib import ExitStack
+from collections import OrderedDict
 
 # Move Editor logic to a separate class
+def editor_journal_key(session_data, user):
+    # Autosave journal of a saved drill, or of the draft a user is writing for a date
+    session_id = session_data.get('id')
+    if session_id and session_id != 999:
+        return f"session:{session_id}"
+    user_id = user['id'] if user else 0
+    date_str = session_data.get('date', datetime.date.today().strftime("%Y-%m-%d"))
+    return f"draft:{user_id}:{date_str}"
+
 class EditorScene:
+    # session_data['journal']: recovered autosave records, read on the DB worker by whoever opens
+    # the editor (see DashboardScene.open_editor) so building the scene never touches the disk
     def __init__(self, manager, session_data=None):
         self.manager = manager
         self.session_data = session_data or {}
@@ -33,37 +51,39 @@ class EditorScene:
         self.input_title.set_text(self.session_title)
         
         self.input_note = InputBox(SCREEN_WIDTH - 420, 20, 300, 40, "Coach's Note...")
-        self.session_note = self.session_data.get('note', "")
+        self.session_note = self.session_data.get('note') or ""
         self.input_note.set_text(self.session_note)
         
         self.input_time = InputBox(450, 20, 100, 40, "10:00")
         self.session_time = self.session_data.get('time', "10:00")
         self.input_time.set_text(self.session_time)
         
+        # Venue: (name, lat, lon); picked in the sidebar from weather.VENUES
+        self.venue = self.session_venue = weather.session_venue(self.session_data)
+        
         # Load Data if exists
         self.load_session()
-            
-        # Animation State
-        self.playing = self.session_data.get('autoplay', False) if len(self.frames) > 1 else False
-        self.current_frame_idx = 0
-        self.t = 0.0 
-        self.PLAY_SPEED = 0.02
-
+        
+        # Undo/Redo (loaded state is the baseline, not an undoable step)
+        self.history = CommandHistory(self)
+        self.drag_start = {} # obj -> (x, y) at mouse down
+        
         # Drawing Tools State
         self.current_tool = 'cursor' # 'cursor', 'arrow_run', 'arrow_pass'
         self.active_arrow = None # Temporary arrow being drawn
         
         self.side_panel = SidePanel("EDITOR TOOLS")
+        self.redraw_on_motion = True # Objects, arrow previews and rotation all follow the mouse
         
         # UI
         ui_y = SCREEN_HEIGHT - 80
         self.buttons = [
-            Button(SCREEN_WIDTH - 60, 20, 40, 40, "", self.go_back, None, theme.TEXT_MUTED, icon_shape='back'), # Back Button (Top Right)
+            Button(SCREEN_WIDTH - 60, 20, 40, 40, "", self.go_back, None, 'TEXT_MUTED', icon_shape='back'), # Back Button (Top Right)
             
             # Action controls remain at the bottom/center
             Button(SCREEN_WIDTH // 2 - 200, ui_y, 140, 50, "ADD STEP", self.save_frame, ACCENT_GREEN, WHITE),
             Button(SCREEN_WIDTH // 2 - 50, ui_y, 60, 50, "", self.play_toggle, ACCENT_YELLOW, WHITE, icon_shape='play'),
-            Button(SCREEN_WIDTH // 2 + 20, ui_y, 60, 50, "", self.undo_last_step, None, WHITE, icon_shape='undo'),
+            Button(SCREEN_WIDTH // 2 + 20, ui_y, 60, 50, "", self.undo, None, WHITE, icon_shape='undo'),
             Button(SCREEN_WIDTH // 2 + 90, ui_y, 100, 50, "RESET", self.reset_drill, ACCENT_RED, WHITE),
             
             # Sidebar Tools
@@ -77,7 +97,7 @@ class EditorScene:
             Button(20, 690, 100, 40, "BALL", lambda: self.set_tool('ball'), WHITE, BLACK),
             Button(130, 690, 100, 40, "TEXT", lambda: self.set_tool('text'), EMERALD_GREEN, WHITE),
             
-            Button(20, 740, 100, 40, "CURSOR", lambda: self.set_tool('cursor'), theme.TEXT_MAIN, theme.UI_PANEL),
+            Button(20, 740, 100, 40, "CURSOR", lambda: self.set_tool('cursor'), 'TEXT_MAIN', 'UI_PANEL'),
 
             # Save Button
             Button(SCREEN_WIDTH - 120, ui_y, 100, 50, "SAVE", self.save_to_db, ACCENT_YELLOW, BLACK),
@@ -90,6 +110,12 @@ class EditorScene:
 
         self.drop_view = Dropdown(20, 260, 200, 40, v_options, self.change_pitch_view, "Pitch View")
         
+        # Venue (a saved venue that is no longer in VENUES stays listed)
+        venue_opts = list(weather.VENUES)
+        if self.venue[0] not in weather.VENUES: venue_opts.append(self.venue[0])
+        self.drop_venue = Dropdown(20, 200, 200, 40, venue_opts, self.set_venue, "Venue")
+        self.drop_venue.selected_idx = venue_opts.index(self.venue[0])
+        
         # Team A Controls
         self.drop_team_a = Dropdown(20, 330, 200, 40, f_options, lambda f: self.apply_formation(f, "A"), "Formation Team A")
         self.drop_add_a = Dropdown(20, 375, 200, 40, count_opts, lambda n: self.spawn_squad(int(n), "A"), "Add Squad A")
@@ -106,10 +132,35 @@ class EditorScene:
         
         self.icon = None
         try:
-            raw_icon = pygame.image.load("app_icon.png").convert_alpha()
-            self.icon = pygame.transform.smoothscale(raw_icon, (40, 40))
+            self.icon = load_icon(40)
         except: pass
 
+        # Autosave Journal: replay unsaved edits from a previous run, then keep journaling.
+        # Last, so every widget a replayed record touches (title, venue dropdown, ...) exists
+        self.recovered_ops = 0
+        self.recovered_timer = 0
+        self.autosave = AutosaveJournal(self.journal_key())
+        self.replay_journal(self.session_data.get('journal'))
+        self.journal_meta = (self.input_title.text, self.input_note.text, self.input_time.text, self.venue)
+        self.history.listener = self.journal_listener
+            
+        # Animation State
+        self.playing = self.session_data.get('autoplay', False) if len(self.frames) > 1 else False
+        self.current_frame_idx = 0
+        self.t = 0.0 
+        self.PLAY_SPEED = 0.02
+
+    def layout(self, w, h):
+        # Window resized: move the widgets, every bit of editor state stays as it is
+        self.pitch_rect = pygame.Rect(PITCH_MARGIN, PITCH_MARGIN, w - 2*PITCH_MARGIN, h - 2*PITCH_MARGIN - UI_HEIGHT)
+        self.input_note.rect.x = w - 420
+        self.side_panel.layout(h)
+        ui_y = h - 80
+        self.buttons[0].rect.x = w - 60 # Back
+        for btn, dx in zip(self.buttons[1:5], (-200, -50, 20, 90)): # ADD STEP, Play, Undo, RESET
+            btn.rect.topleft = (w // 2 + dx, ui_y)
+        self.buttons[12].rect.topleft = (w - 120, ui_y) # SAVE
+
     def load_session(self):
         # 1. Load Players/Frames from JSON data
         raw_data = self.session_data.get('data', {})
@@ -123,7 +174,7 @@ class EditorScene:
                 self.players.append(obj)
             
             # Reconstruct frames
-            self.frames = raw_data.get('frames', [])
+            self.frames = list(raw_data.get('frames', []))
             
             # Reconstruct text labels
             t_list = raw_data.get('text_labels', [])
@@ -137,14 +188,93 @@ class EditorScene:
             self.session_time = self.session_data.get('time', "10:00")
             self.input_time.set_text(self.session_time)
             
+        # What is already stored as rows, so SAVE only writes the difference
+        # (legacy JSON sessions start empty and get fully written on first save)
+        self.saved_frames = []
+        self.saved_objects = {}
+        if raw_data and raw_data.get('storage') == 'rows':
+            self.saved_frames = list(self.frames)
+            self.saved_objects = self.serialize_objects()
+            
         # 2. If no players, we don't add defaults anymore (user wants to add them manually)
         # But we keep this for legacy or if we want to force a start.
         # For now, let's keep it empty as requested.
         pass
 
+    # --- Autosave Journal ---
+
+    def journal_key(self):
+        return editor_journal_key(self.session_data, self.manager.current_user)
+
+    def serialize_item(self, attr, item):
+        return item if attr == 'frames' else item.to_dict()
+
+    def deserialize_item(self, attr, d):
+        if attr == 'players': return DrillObject.from_dict(d)
+        if attr == 'text_labels': return TextObject.from_dict(d)
+        if attr == 'arrows': return DrillArrow.from_dict(d)
+        return d
+
+    def journal_listener(self, kind, cmd):
+        # Turn history changes into small JSON records (indices are valid right after the change)
+        if kind in ('begin', 'end', 'undo', 'redo'):
+            self.autosave.record({'op': kind})
+        elif isinstance(cmd, Splice):
+            self.autosave.record({'op': 'splice', 'list': cmd.attr, 'index': cmd.index, 'removed': len(cmd.removed),
+                                  'inserted': [self.serialize_item(cmd.attr, it) for it in cmd.inserted]})
+        elif isinstance(cmd, MoveObjects):
+            moves = []
+            for obj, (_, new) in cmd.moves.items():
+                attr = 'players' if obj in self.players else 'text_labels'
+                moves.append([attr, getattr(self, attr).index(obj), new[0], new[1]])
+            self.autosave.record({'op': 'move', 'moves': moves})
+        elif isinstance(cmd, Compound):
+            self.journal_listener('begin', None)
+            for c in cmd.commands: self.journal_listener('do', c)
+            self.journal_listener('end', None)
+
+    def replay_journal(self, records):
+        if not records: return
+        group = ExitStack()
+        for r in records:
+            # A bad record is skipped; it must never keep the drill from opening
+            try:
+                op = r['op']
+                if op == 'begin':
+                    group.enter_context(self.history.group())
+                elif op == 'end':
+                    group.close()
+                elif op == 'undo':
+                    self.history.undo()
+                elif op == 'redo':
+                    self.history.redo()
+                elif op == 'splice':
+                    lst = getattr(self, r['list'])
+                    removed = lst[r['index']:r['index'] + r['removed']]
+                    inserted = [self.deserialize_item(r['list'], d) for d in r['inserted']]
+                    self.history.execute(Splice(r['list'], r['index'], removed, inserted))
+                elif op == 'move':
+                    moves = {}
+                    for attr, idx, x, y in r['moves']:
+                        obj = getattr(self, attr)[idx]
+                        moves[obj] = (obj.pos, (x, y))
+                    self.history.execute(MoveObjects(moves))
+                elif op == 'meta':
+                    self.input_title.set_text(r['title'])
+                    self.input_note.set_text(r['note'])
+                    self.input_time.set_text(r['time'])
+                    if r.get('venue'): self.set_venue_tuple(tuple(r['venue']))
+                self.recovered_ops += 1
+            except Exception as e:
+                print(f"Journal replay skipped a record: {e}")
+        group.close()
+        if self.recovered_ops:
+            self.recovered_timer = 240
+            print(f"Recovered {self.recovered_ops} unsaved edits")
+
     def apply_formation(self, formation_name, team):
         # Clear existing players of that team
-        self.players = [p for p in self.players if not p.id.startswith(team)]
+        new_players = [p for p in self.players if not p.id.startswith(team)]
         
         coords = get_formation(formation_name, mirrored=(team == "B"))
         
@@ -153,19 +283,22 @@ class EditorScene:
         
         for i, pos in enumerate(coords):
             # Find next free number for label
-            new_num = self.get_next_player_number()
+            new_num = self.get_next_player_number(new_players)
             obj = DrillObject(f"{team}{new_num}", pos[0], pos[1], color, stroke, str(new_num), "player")
-            self.players.append(obj)
+            new_players.append(obj)
         
         # Add ball if not present
-        if not any(p.type == 'ball' for p in self.players):
-            self.players.append(DrillObject("ball", 0.5, 0.5, BALL_COLOR, BALL_STROKE, "", "ball"))
+        if not any(p.type == 'ball' for p in new_players):
+            new_players.append(DrillObject("ball", 0.5, 0.5, BALL_COLOR, BALL_STROKE, "", "ball"))
 
-        # Captured for animation
-        self.save_frame()
+        with self.history.group():
+            self.history.execute(Splice.replace_all(self, 'players', new_players))
+            # Captured for animation
+            self.save_frame()
 
-    def get_next_player_number(self):
-        existing = [int(p.label) for p in self.players if p.label.isdigit()]
+    def get_next_player_number(self, players=None):
+        if players is None: players = self.players
+        existing = [int(p.label) for p in players if p.label.isdigit()]
         n = 1
         while n in existing: n += 1
         return n
@@ -176,6 +309,15 @@ class EditorScene:
     def change_pitch_view(self, view_name):
         projector.set_view(view_name)
 
+    def set_venue(self, name):
+        if name in weather.VENUES: self.set_venue_tuple((name, *weather.VENUES[name]))
+        else: self.set_venue_tuple(self.session_venue) # The saved venue no longer in the list
+
+    def set_venue_tuple(self, venue):
+        self.venue = venue
+        if venue[0] not in self.drop_venue.options: self.drop_venue.options.append(venue[0]) # Recovered custom venue
+        self.drop_venue.selected_idx = self.drop_venue.options.index(venue[0])
+
     def spawn_squad(self, count, team):
         # Spawn N players in a line/grid near the center
         color = TEAM_A_COLOR if team == "A" else TEAM_B_COLOR
@@ -183,15 +325,16 @@ class EditorScene:
         
         wx_base, wy_base = projector.from_screen(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
         
-        for i in range(count):
-            num = self.get_next_player_number()
-            # Spacing offset
-            wx = wx_base + (i % 4) * 0.05 - 0.1
-            wy = wy_base + (i // 4) * 0.05 - 0.1
-            p_id = f"{team}{num}"
-            self.players.append(DrillObject(p_id, wx, wy, color, stroke, str(num), "player"))
-        
-        self.save_frame()
+        with self.history.group():
+            for i in range(count):
+                num = self.get_next_player_number()
+                # Spacing offset
+                wx = wx_base + (i % 4) * 0.05 - 0.1
+                wy = wy_base + (i // 4) * 0.05 - 0.1
+                p_id = f"{team}{num}"
+                self.add_object('players', DrillObject(p_id, wx, wy, color, stroke, str(num), "player"))
+            
+            self.save_frame()
 
     def spawn_player(self, team):
         color = TEAM_A_COLOR if team == "A" else TEAM_B_COLOR
@@ -203,20 +346,49 @@ class EditorScene:
         
         # Spawn near side center based on current view if possible, or just default
         wx, wy = projector.from_screen(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        self.players.append(DrillObject(p_id, wx, wy, color, stroke, label, "player"))
-        # If this is the first item ever and no frames, capture start
-        if len(self.frames) == 0:
-            self.save_frame()
+        with self.history.group():
+            self.add_object('players', DrillObject(p_id, wx, wy, color, stroke, label, "player"))
+            # If this is the first item ever and no frames, capture start
+            if len(self.frames) == 0:
+                self.save_frame()
 
     def spawn_ball(self):
-        self.players.append(DrillObject(f"ball_{random.randint(0,999)}", 0.5, 0.5, BALL_COLOR, BALL_STROKE, "", "ball"))
+        self.add_object('players', DrillObject(f"ball_{random.randint(0,999)}", 0.5, 0.5, BALL_COLOR, BALL_STROKE, "", "ball"))
 
     def clear_all_players(self):
-        self.players = []
-        self.arrows = []
-        self.text_labels = []
-        self.frames = []
-        self.save_frame()
+        with self.history.group():
+            for attr in ['players', 'arrows', 'text_labels', 'frames']:
+                self.history.execute(Splice.replace_all(self, attr, []))
+            self.save_frame()
+
+    # --- Undoable edits ---
+
+    def add_object(self, attr, obj):
+        self.history.execute(Splice.insert(self, attr, obj))
+
+    def remove_object(self, attr, obj):
+        self.history.execute(Splice.remove(self, attr, obj))
+
+    def begin_drag(self):
+        self.drag_start = {o: tuple(o.pos) for o in self.players + self.text_labels if o.is_dragging}
+
+    def end_drag(self):
+        if self.drag_start:
+            self.history.push(MoveObjects({o: (start, o.pos) for o, start in self.drag_start.items()}))
+            self.drag_start = {}
+
+    def undo(self):
+        if self.history.undo(): self.after_history_change()
+
+    def redo(self):
+        if self.history.redo(): self.after_history_change()
+
+    def after_history_change(self):
+        # Reset animation state
+        self.playing = False
+        self.current_frame_idx = max(0, len(self.frames) - 1)
+        self.t = 0.0
+        self.active_arrow = None
 
     def toggle_projection(self):
         projector.mode = '2D' if projector.mode == '3D' else '3D'
@@ -226,41 +398,59 @@ class EditorScene:
                 b.text = "2D MODE" if projector.mode == '3D' else "3D MODE"
                 break
 
+    def serialize_objects(self):
+        # {(kind, ord): dict} - current pos is saved as the base position
+        objs = {}
+        for i, p in enumerate(self.players): objs[('players', i)] = p.to_dict()
+        for i, t in enumerate(self.text_labels): objs[('text_labels', i)] = t.to_dict()
+        return objs
+
+    def content_delta(self):
+        # Steps are only ever appended/popped, so compare by identity to find the first changed one
+        step_start = 0
+        for saved, cur in zip(self.saved_frames, self.frames):
+            if saved is not cur: break
+            step_start += 1
+        objs = self.serialize_objects()
+        changed = [(kind, i, d) for (kind, i), d in objs.items() if self.saved_objects.get((kind, i)) != d]
+        counts = {'players': len(self.players), 'text_labels': len(self.text_labels)}
+        return step_start, self.frames[step_start:], changed, counts
+
     def save_to_db(self):
-        # Serialize
-        players_data = []
-        for p in self.players:
-            players_data.append({
-                'id': p.id,
-                'x': p.pos.x, # Save current pos as base
-                'y': p.pos.y,
-                'color': p.color,
-                'stroke': p.stroke_color,
-                'label': p.label,
-                'type': p.type
-            })
-            
-        data_dict = {
-            'players': players_data,
-            'frames': self.frames,
-            'text_labels': [{'id': t.id, 'x': t.pos.x, 'y': t.pos.y, 'text': t.text, 'color': t.color} for t in self.text_labels],
-            'note': self.input_note.text
-        }
-        
         user_id = self.manager.current_user['id']
         date_str = datetime.date.today().strftime("%Y-%m-%d")
         
         self.session_title = self.input_title.text if self.input_title.text else "Custom Drill"
         session_time = self.input_time.text if self.input_time.text else "10:00"
         
+        # The write runs on the DB worker; the dashboard's reload is queued behind it
         if self.session_id and self.session_id != 999:
-            # Update
-            database.update_session(self.session_id, data_dict, self.session_title, session_time)
-            print("Session Updated!")
+            # Update: only the steps/objects that changed since load
+            step_start, new_steps, changed, counts = self.content_delta()
+            fut = db_worker.submit(database.save_session_delta, self.session_id, step_start, new_steps, changed, counts,
+                                   self.session_title, session_time, self.input_note.text, self.venue)
+            done_msg = f"Session Updated! ({len(new_steps)} steps, {len(changed)} objects written)"
         else:
             # Create
-            database.create_session(user_id, self.session_title, self.session_data.get('date', date_str), session_time, "UPCOMING", data_dict)
-            print(f"New Session Created for {self.session_data.get('date', date_str)} at {session_time}!")
+            data_dict = {
+                'players': [p.to_dict() for p in self.players],
+                'frames': list(self.frames),
+                'text_labels': [t.to_dict() for t in self.text_labels],
+                'note': self.input_note.text
+            }
+            fut = db_worker.submit(database.create_session, user_id, self.session_title, self.session_data.get('date', date_str), session_time, "UPCOMING", data_dict, self.venue)
+            done_msg = f"New Session Created for {self.session_data.get('date', date_str)} at {session_time}!"
+        
+        autosave = self.autosave
+        def on_saved(result):
+            print(done_msg)
+            # Saved: the journal is no longer needed
+            autosave.close(discard=True)
+        def on_failed(e):
+            # Keep the journal so the edits are recovered next time the drill is opened
+            print(f"Save Error: {e}")
+            autosave.close()
+        fut.then(on_saved, on_failed)
         
         # Return to Dashboard
         self.manager.switch_scene("dashboard")
@@ -270,18 +460,24 @@ class EditorScene:
         x = SCREEN_WIDTH // 2 + random.randint(-50, 50)
         y = SCREEN_HEIGHT // 2 + random.randint(-50, 50)
         cone = DrillObject(f"cone_{len(self.players)}", x, y, CONE_COLOR, BLACK, "", "cone")
-        self.players.append(cone)
+        self.add_object('players', cone)
 
     def set_tool(self, tool_name):
         self.current_tool = tool_name
         self.active_arrow = None
 
     def go_back(self):
+        # Leaving without SAVE abandons the edits (a crash keeps them in the journal)
+        self.autosave.close(discard=True)
         self.manager.switch_scene("dashboard")
 
+    def shutdown(self):
+        # App closing: flush pending edits so they can be recovered next time
+        self.autosave.close()
+
     def save_frame(self):
         frame_data = {p.id: (p.pos.x, p.pos.y) for p in self.players}
-        self.frames.append(frame_data)
+        self.add_object('frames', frame_data)
 
     def play_toggle(self):
         if len(self.frames) < 2: return
@@ -292,45 +488,36 @@ class EditorScene:
                 self.t = 0.0
                 
     def reset_drill(self):
-        self.frames.clear()
         self.playing = False
         self.t = 0.0
         self.current_frame_idx = 0
-        
-        # Hard Reset: Restore initial positions and remove added cones
-        # 1. Remove non-player objects (assuming we want to clear Cones)
-        self.players = [p for p in self.players if p.type in ['player', 'ball']]
-        self.arrows.clear()
-        self.text_labels.clear()
         self.active_arrow = None
         self.current_tool = 'cursor'
         
-        # 2. Reset positions
-        for p in self.players:
-            p.reset_position()
+        # Hard Reset (undoable): Restore initial positions and remove added cones
+        with self.history.group():
+            self.history.execute(Splice.replace_all(self, 'frames', []))
+            # 1. Remove non-player objects (assuming we want to clear Cones)
+            self.history.execute(Splice.replace_all(self, 'players', [p for p in self.players if p.type in ['player', 'ball']]))
+            self.history.execute(Splice.replace_all(self, 'arrows', []))
+            self.history.execute(Splice.replace_all(self, 'text_labels', []))
+            # 2. Reset positions
+            self.history.execute(MoveObjects({p: (p.pos, p.start_pos) for p in self.players}))
 
-    def undo_last_step(self):
-        if len(self.frames) > 0:
-            self.frames.pop()
-            # Restore positions to the new last frame, or start_pos if empty
-            if len(self.frames) > 0:
-                last_frame = self.frames[-1]
-                for p in self.players:
-                    if p.id in last_frame:
-                         p.pos = pygame.Vector2(last_frame[p.id])
-            else:
-                 # Revert to start
-                 for p in self.players:
-                     p.reset_position()
-            
-            # Reset animation state
-            self.playing = False
-            self.current_frame_idx = max(0, len(self.frames) - 1)
-            self.t = 0.0
+    def is_animating(self):
+        # Changes without input: playback and the recovered-edits banner
+        return self.playing or self.recovered_timer > 0
 
     def update(self):
         self.side_panel.update()
         projector.set_offset(self.side_panel.current_w)
+        if self.recovered_timer > 0: self.recovered_timer -= 1
+        
+        # Journal metadata edits (title / note / time / venue) when they change
+        meta = (self.input_title.text, self.input_note.text, self.input_time.text, self.venue)
+        if meta != self.journal_meta:
+            self.journal_meta = meta
+            self.autosave.record({'op': 'meta', 'title': meta[0], 'note': meta[1], 'time': meta[2], 'venue': list(meta[3])})
         # Update Icon
         self.buttons[2].icon_shape = 'stop' if self.playing else 'play'
         
@@ -438,6 +625,10 @@ class EditorScene:
         step_surf = self.subtitle_font.render(step_text, True, theme.TEXT_MAIN)
         screen.blit(step_surf, (SCREEN_WIDTH // 2 - 50, SCREEN_HEIGHT - 130))
         
+        if self.recovered_timer > 0:
+            rec_surf = self.subtitle_font.render(f"Recovered {self.recovered_ops} unsaved edits", True, ACCENT_YELLOW)
+            screen.blit(rec_surf, (SCREEN_WIDTH // 2 - rec_surf.get_width() // 2, SCREEN_HEIGHT - 160))
+        
         # Side Panel Sidebar
         self.side_panel.draw(screen)
         
@@ -461,6 +652,7 @@ class EditorScene:
                 if is_active:
                      pygame.draw.rect(screen, theme.ACCENT, btn.rect.inflate(4, 4), 2, border_radius=btn.radius)
 
+            self.drop_venue.draw(screen)
             self.drop_view.draw(screen)
             self.drop_team_a.draw(screen)
             self.drop_add_a.draw(screen)
@@ -469,7 +661,7 @@ class EditorScene:
             self.slider_rot.draw(screen)
 
             # Draw any OPEN list on top of everything in sidebar
-            for d in [self.drop_view, self.drop_team_a, self.drop_add_a, self.drop_team_b, self.drop_add_b]:
+            for d in [self.drop_venue, self.drop_view, self.drop_team_a, self.drop_add_a, self.drop_team_b, self.drop_add_b]:
                 if d.is_open:
                     d.draw_list(screen)
                     break
@@ -491,6 +683,7 @@ class EditorScene:
             if self.slider_rot.handle_event(event): return
             for btn in self.buttons[5:12]: # Sidebar tools
                 if btn.handle_event(event): return
+            if self.drop_venue.handle_event(event): return # Its list overlaps the dropdowns below
             if self.drop_team_a.handle_event(event): return
             if self.drop_team_b.handle_event(event): return
             if self.drop_view.handle_event(event): return
@@ -504,6 +697,19 @@ class EditorScene:
 
         self.input_time.handle_event(event)
 
+        # Undo / Redo shortcuts (Ctrl+Z, Ctrl+Y / Ctrl+Shift+Z) unless typing
+        if event.type == pygame.KEYDOWN and (event.mod & pygame.KMOD_CTRL):
+            typing = self.input_title.active or self.input_note.active or self.input_time.active
+            if not typing:
+                if event.key == pygame.K_z and (event.mod & pygame.KMOD_SHIFT): self.redo()
+                elif event.key == pygame.K_z: self.undo()
+                elif event.key == pygame.K_y: self.redo()
+                return
+
+        # Drag finished -> one undo step for the whole drag
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.end_drag()
+
         # Mouse Zoom (Scroll Wheel)
         if event.type == pygame.MOUSEWHEEL:
             projector.zoom = max(0.5, min(2.5, projector.zoom + event.y * 0.1))
@@ -540,7 +746,7 @@ class EditorScene:
 
                 elif event.type == pygame.MOUSEBUTTONUP:
                     if self.active_arrow:
-                        self.arrows.append(self.active_arrow)
+                        self.add_object('arrows', self.active_arrow)
                         self.active_arrow = None
             
             elif self.current_tool == 'text':
@@ -548,12 +754,11 @@ class EditorScene:
                     wx, wy = projector.from_screen(*event.pos)
                     if 0 <= wx <= 1 and 0 <= wy <= 1:
                          new_txt = TextObject(f"txt_{len(self.text_labels)}", wx, wy, "LABEL")
-                         self.text_labels.append(new_txt)
+                         self.add_object('text_labels', new_txt)
                 elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3 and hasattr(event, 'pos'):
                     for t in reversed(self.text_labels):
                         if t.rect.collidepoint(event.pos):
-                            self.text_labels.remove(t)
-                            self.text_labels.remove(t)
+                            self.remove_object('text_labels', t)
                             return
             
             elif self.current_tool == 'ball':
@@ -561,7 +766,7 @@ class EditorScene:
                     wx, wy = projector.from_screen(*event.pos)
                     # Allow placing slightly outside lines, but generally on pitch
                     if -0.1 <= wx <= 1.1 and -0.1 <= wy <= 1.1:
-                         self.players.append(DrillObject(f"ball_{random.randint(0,9999)}", wx, wy, BALL_COLOR, BALL_STROKE, "", "ball"))
+                         self.add_object('players', DrillObject(f"ball_{random.randint(0,9999)}", wx, wy, BALL_COLOR, BALL_STROKE, "", "ball"))
 
             elif self.current_tool == 'cursor':
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3 and hasattr(event, 'pos'):
@@ -569,21 +774,23 @@ class EditorScene:
                         if p.handle_event(event): pass
                         sx, sy = projector.to_screen(p.pos.x, p.pos.y)
                         if pygame.Vector2(event.pos).distance_to((sx, sy)) < 25:
-                            self.players.remove(p)
+                            self.remove_object('players', p)
                             return
                     for arr in reversed(self.arrows):
                         if arr.collidepoint(event.pos):
-                            self.arrows.remove(arr)
+                            self.remove_object('arrows', arr)
                             return
                     for t in reversed(self.text_labels):
                         if t.rect.collidepoint(event.pos):
-                            self.text_labels.remove(t)
+                            self.remove_object('text_labels', t)
                             return
                 
                 for p in reversed(self.players):
                     if p.handle_event(event): break
                 for t in reversed(self.text_labels):
                     if t.handle_event(event): break
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    self.begin_drag()
 
         self.input_title.handle_event(event)
         self.input_note.handle_event(event)
@@ -601,11 +808,7 @@ class LoginScene:
         # Load Icon
         self.icon = None
         try:
-            import os
-            self.icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_icon.png")
-            if os.path.exists(self.icon_path):
-                img = pygame.image.load(self.icon_path).convert_alpha()
-                self.icon = pygame.transform.smoothscale(img, (140, 140))
+            self.icon = load_icon(140)
         except Exception as e:
             print(f"DEBUG: Login icon load fail: {e}")
         
@@ -628,6 +831,7 @@ class LoginScene:
         
         self.message = "Welcome Back, Coach"
         self.msg_color = theme.TEXT_MUTED
+        self.busy = False # Waiting for the DB worker (login/register)
 
     def toggle_role(self):
         self.role = 'player' if self.role == 'coach' else 'coach'
@@ -658,7 +862,20 @@ class LoginScene:
             self.do_register()
 
     def do_login(self):
-        user = database.verify_user(self.input_user.text, self.input_pass.text)
+        if self.busy: return
+        self.busy = True
+        self.message = "Signing in..."
+        self.msg_color = theme.TEXT_MUTED
+        db_worker.submit(database.verify_user, self.input_user.text, self.input_pass.text).then(self.on_login, self.on_db_error)
+
+    def on_db_error(self, e):
+        self.busy = False
+        self.message = f"Error: {e}"
+        self.msg_color = ACCENT_RED
+
+    def on_login(self, user):
+        self.busy = False
+        if not isinstance(self.manager.scene, LoginScene): return
         if user:
             if 'error' in user:
                  self.message = user['error']
@@ -676,14 +893,21 @@ class LoginScene:
             self.msg_color = ACCENT_RED
             return
             
+        if self.busy: return
+        self.busy = True
         coach_name = self.input_coach.text if self.role == 'player' else None
-        success, msg = database.create_user(
+        db_worker.submit(
+            database.create_user,
             self.input_user.text, 
             self.input_pass.text, 
             self.role, 
             self.input_team.text,
             coach_username=coach_name
-        )
+        ).then(self.on_registered, self.on_db_error)
+
+    def on_registered(self, result):
+        self.busy = False
+        success, msg = result
         if success:
              self.message = "Registration Successful! " + ("Login now." if self.role == 'coach' else "Wait for approval.")
              self.msg_color = ACCENT_GREEN
@@ -785,85 +1009,210 @@ class DashboardScene:
         
         self.sidebar = Sidebar('dashboard', self.is_coach)
         
-        # Get Real Data
-        if self.user:
-            self.sessions = database.get_user_sessions(self.user['id'])
-        else:
-            self.sessions = []
-            
         self.btn_delete = None
-            
-        for s in self.sessions:
-            if 'status' not in s: s['status'] = 'UPCOMING'
         
         self.week_offset = 0
         self.selected_date = datetime.date.today().strftime("%Y-%m-%d")
         self.day_rects = []
         
+        # Get Real Data: only the visible week (+ neighbours), indexed by date.
+        # The map is kept on the manager, so a rebuilt dashboard shows the last known
+        # sessions right away while the queries refresh them in the background.
+        uid = self.user['id'] if self.user else None
+        self.sessions_by_date = self.manager.session_cache.setdefault(uid, {}) # 'YYYY-MM-DD' -> [session meta, ...] (sorted by time)
+        self.loaded_weeks = set() # Monday dates fetched (or in flight) for this scene
+        self.loading = 0 # Range queries in flight
+        self.opening = False
+        self.deleted_ids = set() # Deleted here; a reload that was already queued may still return them
+        # Header, week strip and hero card are rendered into cached surfaces and re-rendered only
+        # when their key changes; these counters are part of the keys
+        self.surfaces = {} # name -> (key, surface)
+        self.sessions_version = 0 # Session map changed
+        self.forecast_version = 0 # A forecast arrived
+        self.thumbs_requested = set() # Session ids whose preview was asked for
+        self.hero_text_right = 0 # Right edge of the hero card's title/venue text (set by render_hero_card)
+        self.load_weeks(self.week_offset)
+        
         self.font_header = pygame.font.SysFont("segoeui", 32, bold=True)
         self.font_sub = pygame.font.SysFont("segoeui", 22)
         self.font_small = pygame.font.SysFont("segoeui", 14)
         self.font_bold = pygame.font.SysFont("segoeui", 18, bold=True)
 
-        self.next_session = next((s for s in self.sessions if s['date'] == self.selected_date), None)
+        self.next_session = self.session_for(self.selected_date)
         self.btn_review = None
         self.btn_delete = None
+        self.btn_repeat = None
         if self.next_session:
              self.btn_review = Button(0, 0, 200, 50, "REVIEW DRILL", self.open_next_session, ELECTRIC_BLUE, BLACK, font_size=18)
              if self.is_coach:
                  self.btn_delete = Button(0, 0, 100, 50, "DELETE", self.delete_current_session, ACCENT_RED, WHITE, font_size=18)
+                 self.btn_repeat = Button(0, 0, 200, 50, "REPEAT NEXT WEEK", self.repeat_next_week, None, None, font_size=16)
 
         self.btn_add = Button(SCREEN_WIDTH - 80, SCREEN_HEIGHT - 80, 60, 60, "+", self.create_new, EMERALD_GREEN, WHITE, radius=30, font_size=32)
         self.btn_prev = Button(250, 120, 30, 30, "<", lambda: self.shift_week(-1), None, None)
         self.btn_next = Button(SCREEN_WIDTH - 40, 120, 30, 30, ">", lambda: self.shift_week(1), None, None)
-        self.weather_forecast = {} # Date -> {'temp': X, 'desc': Y}
+        self.forecasts = {} # loc -> {date: {'temp': X, 'desc': Y}}
+        self.weather_locs = set()
 
         self.fetch_weather_data()
         
     def fetch_weather_data(self):
-        def on_forecast(data):
-            if data:
-                self.weather_forecast = data
-            else:
-                self.weather_forecast = {}
-        
-        weather.fetch_weather_forecast(on_forecast)
+        # Home ground plus every venue used in the visible week, queued together so the
+        # service refreshes them with one batched request. Last known forecasts show right
+        # away; the service posts WEATHER_EVENT with cached/refreshed data.
+        start = self.week_start(self.week_offset)
+        coords = [(weather.LAT, weather.LON)]
+        for i in range(7):
+            for s in self.sessions_by_date.get((start + datetime.timedelta(days=i)).strftime("%Y-%m-%d"), []):
+                coords.append(weather.session_venue(s)[1:])
+        for loc in weather.service.request_many(coords):
+            self.weather_locs.add(loc)
+            if loc not in self.forecasts:
+                self.forecasts[loc] = weather.service.get(loc) or {}
+                self.forecast_version += 1
+
+    def forecast_for(self, date_str):
+        # Weather at that day's session venue (home ground on free days)
+        _, lat, lon = weather.session_venue(self.session_for(date_str))
+        return self.forecasts.get(weather.location_key(lat, lon), {}).get(date_str)
+
+    def week_start(self, offset):
+        today = datetime.date.today()
+        return today - datetime.timedelta(days=today.weekday()) + datetime.timedelta(weeks=offset)
+
+    def load_weeks(self, offset):
+        # Visible week plus one on each side, in a single range query for whatever is missing
+        wanted = [self.week_start(offset + d) for d in (-1, 0, 1)]
+        missing = [w for w in wanted if w not in self.loaded_weeks]
+        if not missing: return
+        self.loaded_weeks.update(missing)
+        if not self.user: return
+        
+        ranges = [(w.strftime("%Y-%m-%d"), (w + datetime.timedelta(days=6)).strftime("%Y-%m-%d")) for w in missing]
+        self.loading += 1
+        db_worker.submit(database.get_sessions_in_range, self.user['id'], ranges[0][0], ranges[-1][1]).then(
+            lambda rows: self.on_weeks_loaded(ranges, rows), lambda e: self.on_weeks_loaded(ranges, None, e))
+
+    def on_weeks_loaded(self, ranges, rows, error=None):
+        self.loading -= 1
+        if error is not None:
+            print(f"DB Error: {error}")
+            return
+        # Replace whatever the cache had for these weeks
+        for d in [d for d in self.sessions_by_date if any(a <= d <= b for a, b in ranges)]:
+            del self.sessions_by_date[d]
+        for s in rows:
+            # The span may cover a week we already had (e.g. prev + next missing)
+            if not any(a <= s['date'] <= b for a, b in ranges): continue
+            if s['id'] in self.deleted_ids: continue
+            if not s.get('status'): s['status'] = 'UPCOMING'
+            self.sessions_by_date.setdefault(s['date'], []).append(s)
+        self.sessions_version += 1
+        # Refresh the hero card for the selected day, and the forecasts for its venues
+        if not self.opening: self.select_date(self.selected_date)
+        self.fetch_weather_data()
+
+    def session_for(self, date_str):
+        day = self.sessions_by_date.get(date_str)
+        return day[0] if day else None
 
     def shift_week(self, amount):
         self.week_offset += amount
+        self.load_weeks(self.week_offset)
+        self.fetch_weather_data()
 
     def open_next_session(self):
-        if self.next_session:
-            # Inject autoplay
+        if self.next_session and not self.opening:
+            # Inject autoplay; the drill payload is only loaded now (off the main loop)
             data = self.next_session.copy()
             data['autoplay'] = True
-            self.manager.switch_scene("editor", data)
+            if self.btn_review: self.btn_review.text = "LOADING..."
+            self.open_editor(data)
 
     def create_new(self):
-        self.manager.switch_scene("editor", {"title": "New Custom Drill", "id": 999, "date": self.selected_date})
+        if not self.opening:
+            self.open_editor({"title": "New Custom Drill", "id": 999, "date": self.selected_date})
+
+    def open_editor(self, data):
+        # Drill payload and autosave journal come from the DB worker in one job; the editor is
+        # built (and replays the journal) once both are in, before any edit can happen
+        self.opening = True
+        session_id = data['id'] if data.get('id') != 999 else None
+        def on_state(state):
+            self.opening = False
+            if self.manager.scene is not self: return # User already moved on
+            payload, data['journal'] = state
+            if payload is not None: data['data'] = payload
+            self.manager.switch_scene("editor", data)
+        def on_failed(e):
+            print(f"DB Error: {e}")
+            self.opening = False
+            if self.btn_review: self.btn_review.text = "REVIEW DRILL"
+        key = editor_journal_key(data, self.manager.current_user)
+        db_worker.submit(database.get_editor_state, session_id, key).then(on_state, on_failed)
+
+    def on_enter(self):
+        # Retained scene shown again: re-query the visible weeks (the editor may have saved meanwhile;
+        # its write is queued ahead of this read) and re-request previews of edited drills
+        self.loaded_weeks.clear()
+        self.load_weeks(self.week_offset)
+        self.thumbs_requested.clear()
+        if self.btn_review: self.btn_review.text = "REVIEW DRILL"
+
+    def on_exit(self):
+        self.sidebar.hover_idx = -1
+
+    def layout(self, w, h):
+        # Header, week strip and hero card follow SCREEN_WIDTH when drawn (it is in their cache keys)
+        self.sidebar.layout(h)
+        self.btn_add.rect.topleft = (w - 80, h - 80)
+        self.btn_next.rect.x = w - 40
 
     def select_date(self, date_str):
         self.selected_date = date_str
-        session_on_day = next((s for s in self.sessions if s['date'] == date_str), None)
+        # Make sure that week is in the map (keyboard navigation can leave the prefetched range)
+        day = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+        self.load_weeks((day - self.week_start(0)).days // 7)
+        session_on_day = self.session_for(date_str)
         if session_on_day:
             self.next_session = session_on_day
             self.btn_review = Button(0, 0, 200, 50, "REVIEW DRILL", self.open_next_session, ELECTRIC_BLUE, BLACK, font_size=18)
             if self.is_coach:
                 self.btn_delete = Button(0, 0, 100, 50, "DELETE", self.delete_current_session, ACCENT_RED, WHITE, font_size=18)
+                self.btn_repeat = Button(0, 0, 200, 50, "REPEAT NEXT WEEK", self.repeat_next_week, None, None, font_size=16)
             else:
                 self.btn_delete = None
+                self.btn_repeat = None
         else:
             self.next_session = None
             self.btn_review = None
             self.btn_delete = None
+            self.btn_repeat = None
 
     def delete_current_session(self):
         if self.next_session:
-            database.delete_session(self.next_session['id'])
-            # Refresh
-            self.sessions = database.get_user_sessions(self.user['id'])
+            self.deleted_ids.add(self.next_session['id'])
+            db_worker.submit(database.delete_session, self.next_session['id'])
+            # Refresh (local map, no reload)
+            day = self.sessions_by_date.get(self.next_session['date'], [])
+            if self.next_session in day: day.remove(self.next_session)
+            self.sessions_version += 1
             self.select_date(self.selected_date)
 
+    def repeat_next_week(self):
+        # Same drill a week later: the content is shared in the DB, only a new session row is written
+        if not self.next_session: return
+        src = self.next_session
+        target = (datetime.date.fromisoformat(src['date']) + datetime.timedelta(weeks=1)).strftime("%Y-%m-%d")
+        def on_done(new_id):
+            if not new_id: return
+            copy = dict(src, id=new_id, date=target, status='UPCOMING')
+            day = self.sessions_by_date.setdefault(target, [])
+            day.append(copy)
+            day.sort(key=lambda s: s['time'] or "")
+            self.sessions_version += 1
+        db_worker.submit(database.duplicate_session, src['id'], target).then(on_done)
+
     def change_date(self, delta):
         # Calculate new date
         curr = datetime.datetime.strptime(self.selected_date, "%Y-%m-%d").date()
@@ -871,8 +1220,7 @@ class DashboardScene:
         new_date_str = new_date.strftime("%Y-%m-%d")
         
         # Check if we need to shift week offset
-        today = datetime.date.today()
-        start_of_week = today - datetime.timedelta(days=today.weekday()) + datetime.timedelta(weeks=self.week_offset)
+        start_of_week = self.week_start(self.week_offset)
         end_of_week = start_of_week + datetime.timedelta(days=6)
         
         if new_date < start_of_week:
@@ -886,9 +1234,15 @@ class DashboardScene:
         pass
 
     def handle_event(self, event):
+        if event.type == weather.WEATHER_EVENT:
+            if event.loc in self.weather_locs and self.forecasts.get(event.loc) != event.forecast:
+                self.forecasts[event.loc] = event.forecast
+                self.forecast_version += 1
+            return
         if self.sidebar.handle_event(event, self.manager): return
         if self.btn_review and self.btn_review.handle_event(event): return
         if self.btn_delete and self.btn_delete.handle_event(event): return
+        if self.btn_repeat and self.btn_repeat.handle_event(event): return
         if self.btn_prev.handle_event(event): return
         if self.btn_next.handle_event(event): return
         if self.btn_add.handle_event(event): return
@@ -904,53 +1258,71 @@ class DashboardScene:
                 if rect.collidepoint(event.pos):
                     self.select_date(date_str)
 
+    def cached_surface(self, name, key, render):
+        hit = self.surfaces.get(name)
+        if hit is None or hit[0] != key:
+            hit = (key, render())
+            self.surfaces[name] = hit
+        return hit[1]
+
     def draw_header(self, screen):
         # Draw inside main area (offset by sidebar)
         tx = self.sidebar.current_w + 30
         ty = 40
+        key = (self.selected_date, self.forecast_version, self.sessions_version, theme.mode, tx, SCREEN_WIDTH)
+        screen.blit(self.cached_surface('header', key, lambda: self.render_header(SCREEN_WIDTH - tx)), (tx, ty))
+
+    def render_header(self, w):
+        surf = pygame.Surface((w, 70), pygame.SRCALPHA)
         welcome = self.font_header.render(f"Hello, {self.user_name}", True, theme.TEXT_MAIN)
-        screen.blit(welcome, (tx, ty))
+        surf.blit(welcome, (0, 0))
         
         sub = self.font_small.render(f"Ready for training with {self.team_name}?", True, theme.TEXT_MUTED)
-        screen.blit(sub, (tx, ty + 45))
+        surf.blit(sub, (0, 45))
         
         # Weather Display for Selected Date
-        w_data = self.weather_forecast.get(self.selected_date)
+        w_data = self.forecast_for(self.selected_date)
         if w_data:
             w_text = f"{w_data['temp']}°C | {w_data['desc']}"
             w_col = EMERALD_GREEN if "Clear" in w_data['desc'] else ACCENT_YELLOW
             w_surf = self.font_bold.render(w_text, True, w_col)
             # Align weather to the right
-            screen.blit(w_surf, (SCREEN_WIDTH - w_surf.get_width() - 40, ty + 10))
+            surf.blit(w_surf, (w - w_surf.get_width() - 40, 10))
+        return surf
 
     def draw_week_strip(self, screen):
-        self.day_rects = []
         base_x = self.sidebar.current_w + 30
         strip_w = SCREEN_WIDTH - base_x - 40
-        slot_w = strip_w // 7
-        
         today = datetime.date.today()
-        start_of_week = today - datetime.timedelta(days=today.weekday()) + datetime.timedelta(weeks=self.week_offset)
+        key = (self.week_offset, self.selected_date, self.forecast_version, self.sessions_version,
+               theme.mode, base_x, SCREEN_WIDTH, today)
+        screen.blit(self.cached_surface('week_strip', key, lambda: self.render_week_strip(base_x, strip_w, today)), (base_x, 100))
+
+    def render_week_strip(self, base_x, strip_w, today):
+        # Also lays out day_rects (screen coordinates) for clicks
+        self.day_rects = []
+        slot_w = strip_w // 7
+        surf = pygame.Surface((max(strip_w, 1), 80), pygame.SRCALPHA)
+        today_str = today.strftime("%Y-%m-%d")
+        start_of_week = self.week_start(self.week_offset)
         
         for i in range(7):
             day = start_of_week + datetime.timedelta(days=i)
             day_str = day.strftime("%Y-%m-%d")
             
-            x = base_x + i * slot_w
-            y = 100
-            rect = pygame.Rect(x, y, slot_w - 10, 80)
-            self.day_rects.append((rect, day_str))
+            rect = pygame.Rect(i * slot_w, 0, slot_w - 10, 80)
+            self.day_rects.append((rect.move(base_x, 100), day_str))
             
             is_selected = day_str == self.selected_date
-            is_today = day_str == today.strftime("%Y-%m-%d")
+            is_today = day_str == today_str
             
             bg = theme.CHARCOAL_CARD
             if is_selected: bg = ELECTRIC_BLUE
             elif is_today: bg = theme.SIDEBAR_ACTIVE
             
-            pygame.draw.rect(screen, bg, rect, border_radius=12)
+            pygame.draw.rect(surf, bg, rect, border_radius=12)
             if is_today and not is_selected:
-                pygame.draw.rect(screen, ELECTRIC_BLUE, rect, 2, border_radius=12)
+                pygame.draw.rect(surf, ELECTRIC_BLUE, rect, 2, border_radius=12)
             
             # Text
             d_name = day.strftime("%a").upper()
@@ -958,46 +1330,80 @@ class DashboardScene:
             
             col = WHITE if is_selected else theme.TEXT_MUTED
             name_surf = self.font_small.render(d_name, True, col)
-            screen.blit(name_surf, (rect.centerx - name_surf.get_width()//2, rect.y + 15))
+            surf.blit(name_surf, (rect.centerx - name_surf.get_width()//2, rect.y + 15))
             
             num_surf = self.font_bold.render(d_num, True, WHITE if is_selected else theme.TEXT_MAIN)
-            screen.blit(num_surf, (rect.centerx - num_surf.get_width()//2, rect.y + 35))
+            surf.blit(num_surf, (rect.centerx - num_surf.get_width()//2, rect.y + 35))
             
             # Mini Weather
-            w_day = self.weather_forecast.get(day_str)
+            w_day = self.forecast_for(day_str)
             if w_day:
                 w_mini = self.font_small.render(f"{int(w_day['temp'])}°", True, theme.TEXT_HINT if not is_selected else WHITE)
-                screen.blit(w_mini, (rect.centerx - w_mini.get_width()//2, rect.y + 60))
+                surf.blit(w_mini, (rect.centerx - w_mini.get_width()//2, rect.y + 60))
+        return surf
 
     def draw_hero_card(self, screen):
         base_x = self.sidebar.current_w + 30
         area_rect = pygame.Rect(base_x, 200, SCREEN_WIDTH - base_x - 40, 300)
-        pygame.draw.rect(screen, theme.CHARCOAL_CARD, area_rect, border_radius=15)
+        s = self.next_session
+        shown = (s['id'], s['title'], s['time'], weather.session_venue(s)) if s else bool(self.loading)
+        key = (shown, theme.mode, area_rect.size)
+        screen.blit(self.cached_surface('hero_card', key, lambda: self.render_hero_card(area_rect.size)), area_rect.topleft)
+        
+        # Buttons stay live (hover)
+        if s:
+            if self.btn_review:
+                self.btn_review.rect.topleft = (area_rect.x + 40, area_rect.y + 150)
+                self.btn_review.draw(screen)
+            if self.btn_delete:
+                self.btn_delete.rect.topleft = (area_rect.x + 260, area_rect.y + 150)
+                self.btn_delete.draw(screen)
+            if self.btn_repeat:
+                self.btn_repeat.rect.topleft = (area_rect.x + 380, area_rect.y + 150)
+                self.btn_repeat.draw(screen)
+        
+        # Drill preview, in the slot right of the text and buttons when the card is wide enough for it
+        # (rendered off the main loop the first time the card shows this session)
+        if s:
+            info_right = area_rect.x + self.hero_text_right
+            for btn in (self.btn_review, self.btn_delete, self.btn_repeat):
+                if btn: info_right = max(info_right, btn.rect.right)
+            tx, ty = area_rect.right - 40 - thumbnails.THUMB_SIZE[0], area_rect.y + 40
+            if tx >= info_right + 40:
+                if s['id'] not in self.thumbs_requested:
+                    self.thumbs_requested.add(s['id'])
+                    thumbnails.service.request(s['id'])
+                thumb = thumbnails.service.get(s['id'])
+                if thumb:
+                    screen.blit(thumb, (tx, ty))
+                    pygame.draw.rect(screen, theme.BORDER, (tx, ty, thumb.get_width(), thumb.get_height()), 1)
+
+    def render_hero_card(self, size):
+        surf = pygame.Surface(size, pygame.SRCALPHA)
+        area_rect = surf.get_rect()
+        pygame.draw.rect(surf, theme.CHARCOAL_CARD, area_rect, border_radius=15)
         
         if self.next_session:
             # Info
             title = self.font_sub.render(self.next_session['title'], True, theme.TEXT_MAIN)
-            screen.blit(title, (area_rect.x + 40, area_rect.y + 40))
+            surf.blit(title, (area_rect.x + 40, area_rect.y + 40))
             
-            info = f"Scheduled for {self.next_session['time']} • Venue: Main Pitch"
+            info = f"Scheduled for {self.next_session['time']} • Venue: {weather.session_venue(self.next_session)[0]}"
             info_surf = self.font_small.render(info, True, theme.TEXT_MUTED)
-            screen.blit(info_surf, (area_rect.x + 40, area_rect.y + 75))
+            surf.blit(info_surf, (area_rect.x + 40, area_rect.y + 75))
+            self.hero_text_right = 40 + max(title.get_width(), info_surf.get_width())
             
             # Progress/Stats in Card
-            pygame.draw.line(screen, theme.DEEP_CHARCOAL, (area_rect.x + 40, area_rect.y + 120), (area_rect.right - 40, area_rect.y + 120), 1)
-            
-            # Button
-            if self.btn_review:
-                self.btn_review.rect.topleft = (area_rect.x + 40, area_rect.y + 150)
-                self.btn_review.draw(screen)
-            if self.btn_delete:
-                self.btn_delete.rect.topleft = (area_rect.x + 260, area_rect.y + 150)
-                self.btn_delete.draw(screen)
+            pygame.draw.line(surf, theme.DEEP_CHARCOAL, (area_rect.x + 40, area_rect.y + 120), (area_rect.right - 40, area_rect.y + 120), 1)
+        elif self.loading:
+            msg = self.font_sub.render("Loading sessions...", True, theme.TEXT_MUTED)
+            surf.blit(msg, (area_rect.centerx - msg.get_width()//2, area_rect.centery - 20))
         else:
             msg = self.font_sub.render("Rest Day 🧘", True, theme.TEXT_MUTED)
-            screen.blit(msg, (area_rect.centerx - msg.get_width()//2, area_rect.centery - 20))
+            surf.blit(msg, (area_rect.centerx - msg.get_width()//2, area_rect.centery - 20))
             sub = self.font_small.render("No drills scheduled for this date", True, theme.TEXT_HINT)
-            screen.blit(sub, (area_rect.centerx - sub.get_width()//2, area_rect.centery + 20))
+            surf.blit(sub, (area_rect.centerx - sub.get_width()//2, area_rect.centery + 20))
+        return surf
 
     def update(self):
         self.sidebar.update()
@@ -1022,8 +1428,9 @@ class TeamScene:
         self.title_font = pygame.font.SysFont("segoeui", 32, bold=True)
         self.list_font = pygame.font.SysFont("segoeui", 20)
         
-        self.pending = database.get_pending_players(self.coach_id)
-        self.approved = database.get_team_players(self.coach_id)
+        self.pending = []
+        self.approved = []
+        self.loading = False
         
         self.input_new_user = InputBox(250, 600, 250, 40, "New Player Username")
         self.input_new_pass = InputBox(520, 600, 250, 40, "Player Password")
@@ -1040,22 +1447,24 @@ class TeamScene:
             self.msg_col = ACCENT_RED
             return
         
-        success, msg = database.create_user(
-            self.input_new_user.text, 
+        # Added by the coach directly -> approved in the same insert
+        name = self.input_new_user.text
+        db_worker.submit(
+            database.create_user,
+            name, 
             self.input_new_pass.text, 
             'player', 
             self.manager.current_user['team_name'],
-            coach_username=self.manager.current_user['username']
-        )
+            coach_username=self.manager.current_user['username'],
+            status='APPROVED'
+        ).then(lambda res: self.on_invited(name, res))
+        self.msg = "Adding player..."
+        self.msg_col = theme.TEXT_MUTED
+
+    def on_invited(self, name, result):
+        success, msg = result
         if success:
-            import sqlite3
-            conn = sqlite3.connect(database.DB_NAME)
-            c = conn.cursor()
-            c.execute('UPDATE users SET status = "APPROVED" WHERE username = ?', (self.input_new_user.text,))
-            conn.commit()
-            conn.close()
-            
-            self.msg = f"Player {self.input_new_user.text} added and approved!"
+            self.msg = f"Player {name} added and approved!"
             self.msg_col = ACCENT_GREEN
             self.input_new_user.set_text("")
             self.input_new_pass.set_text("")
@@ -1064,16 +1473,33 @@ class TeamScene:
             self.msg = f"Error: {msg}"
             self.msg_col = ACCENT_RED
 
+    def on_enter(self):
+        self.msg = ""
+        self.refresh_ui()
+
+    def on_exit(self):
+        self.sidebar.hover_idx = -1
+
+    def layout(self, w, h):
+        self.sidebar.layout(h)
+
     def refresh_ui(self):
-        self.pending = database.get_pending_players(self.coach_id)
-        self.approved = database.get_team_players(self.coach_id)
+        # Both lists in one worker job; the current lists stay on screen until it returns
+        cid = self.coach_id
+        self.loading = True
+        db_worker.submit(lambda: (database.get_pending_players(cid), database.get_team_players(cid))).then(self.on_players)
+
+    def on_players(self, lists):
+        self.loading = False
+        self.pending, self.approved = lists
         self.approve_buttons = []
         for i, p in enumerate(self.pending):
             btn = Button(800, 160 + i*40 - 10, 120, 40, "APPROVE", lambda pid=p['id']: self.approve(pid), ACCENT_GREEN, WHITE)
             self.approve_buttons.append(btn)
 
     def approve(self, pid):
-        database.approve_player(pid)
+        # Queued in order: the refresh reads after the approval commits
+        db_worker.submit(database.approve_player, pid)
         self.refresh_ui()
 
     def handle_event(self, event):
@@ -1109,6 +1535,9 @@ class TeamScene:
         # Draw Approved
         a_title = self.list_font.render("TEAM ROSTER", True, EMERALD_GREEN)
         screen.blit(a_title, (tx + 350, 120))
+        if self.loading and not self.pending and not self.approved:
+            l_surf = self.list_font.render("Loading...", True, theme.TEXT_MUTED)
+            screen.blit(l_surf, (tx + 20, 160))
         for i, p in enumerate(self.approved):
             txt = self.list_font.render(f"{i+1}. {p['username']}", True, theme.TEXT_MAIN)
             screen.blit(txt, (tx + 370, 160 + i*40))
@@ -1134,20 +1563,128 @@ class TeamScene:
             screen.blit(m_surf, (tx, 560))
 
 class AnalyticsScene:
+    RANGES = [("4W", 28), ("3M", 91), ("1Y", 365)]
+    
     def __init__(self, manager):
         self.manager = manager
-        self.is_coach = self.manager.current_user['role'] == 'coach'
+        user = self.manager.current_user
+        self.is_coach = user['role'] == 'coach'
         self.sidebar = Sidebar('analytics', self.is_coach)
         self.title_font = pygame.font.SysFont("segoeui", 32, bold=True)
         self.font_sub = pygame.font.SysFont("segoeui", 18)
+        self.font_small = pygame.font.SysFont("segoeui", 14)
+        self.font_bold = pygame.font.SysFont("segoeui", 22, bold=True)
+        
+        # What is shown: (scope, owner_id, label). Coaches get the squad plus each player.
+        self.scopes = [('team', user['id'], "Squad")] if self.is_coach else [('player', user['id'], "My")]
+        self.scope_idx = 0
+        self.metric = None
+        self.range_days = 28
+        
+        # Engine output for the current selection (computed on the DB worker, cached there)
+        self.result = None
+        self.loading = False
+        self.request_id = 0 # Responses for an older selection are dropped
+        self.chart = LineChart((0, 160, 100, 300))
+        
+        self.drop_metric = Dropdown(0, 100, 180, 36, [], self.set_metric, "Metric")
+        self.range_btns = [Button(0, 100, 50, 36, label, lambda d=days: self.set_range(d), None, None, font_size=14) for label, days in self.RANGES]
+        self.btn_scope_prev = Button(0, 100, 30, 36, "<", lambda: self.shift_scope(-1), None, None)
+        self.btn_scope_next = Button(0, 100, 30, 36, ">", lambda: self.shift_scope(1), None, None)
+        
+        self.load_players()
+        self.load_metrics()
+
+    def on_enter(self):
+        # New logs change the engine's stamps, so unchanged selections come back from its cache
+        self.load_players()
+        self.load_metrics()
+
+    def on_exit(self):
+        self.sidebar.hover_idx = -1
+        self.drop_metric.is_open = False
+
+    def layout(self, w, h):
+        self.sidebar.layout(h) # Chart and controls are placed when drawn
+
+    def load_players(self):
+        if self.is_coach:
+            db_worker.submit(database.get_team_players, self.manager.current_user['id']).then(self.on_players)
+        
+    def on_players(self, players):
+        self.scopes = self.scopes[:1] + [('player', p['id'], p['username']) for p in players]
+        self.scope_idx = min(self.scope_idx, len(self.scopes) - 1)
+        
+    def shift_scope(self, amount):
+        if len(self.scopes) < 2: return
+        self.scope_idx = (self.scope_idx + amount) % len(self.scopes)
+        self.load_metrics()
+        
+    def load_metrics(self):
+        scope, owner, _ = self.scopes[self.scope_idx]
+        self.request_id += 1
+        self.loading = True
+        rid = self.request_id
+        db_worker.submit(database.get_perf_metrics, scope, owner).then(lambda m: self.on_metrics(rid, m))
+        
+    def on_metrics(self, rid, metrics):
+        if rid != self.request_id: return
+        self.drop_metric.options = metrics
+        if not metrics:
+            self.metric = None
+            self.result = None
+            self.loading = False
+            return
+        if self.metric not in metrics: self.metric = metrics[0]
+        self.drop_metric.selected_idx = metrics.index(self.metric)
+        self.refresh()
+        
+    def set_metric(self, metric):
+        self.metric = metric
+        self.refresh()
+        
+    def set_range(self, days):
+        self.range_days = days
+        self.refresh()
+        
+    def refresh(self):
+        if not self.metric: return
+        scope, owner, _ = self.scopes[self.scope_idx]
+        start, end = analytics.date_range(self.range_days)
+        self.request_id += 1
+        self.loading = True
+        rid = self.request_id
+        db_worker.submit(analytics.engine.get, scope, owner, self.metric, start, end).then(lambda r: self.on_result(rid, r))
+        
+    def on_result(self, rid, result):
+        if rid != self.request_id: return
+        self.result = result
+        self.loading = False
+        if result['days'] is None: return
+        start = datetime.date.fromisoformat(result['start'])
+        self.chart.set_data(
+            [(result['days'], result['daily'], 'TEXT_HINT', 1), (result['days'], result['rolling'], ELECTRIC_BLUE, 3)],
+            (0, max(1, self.range_days - 1)),
+            (start.strftime("%d %b"), datetime.date.fromisoformat(result['end']).strftime("%d %b")),
+            f"{self.scopes[self.scope_idx][2]} {self.metric} (daily avg, {analytics.ROLLING_DAYS}-day rolling)")
         
     def handle_event(self, event):
-        self.sidebar.handle_event(event, self.manager)
-
-    def update(self): pass
+        if self.sidebar.handle_event(event, self.manager): return
+        if self.drop_metric.handle_event(event): return
+        for b in self.range_btns:
+            if b.handle_event(event): return
+        if self.is_coach:
+            if self.btn_scope_prev.handle_event(event): return
+            if self.btn_scope_next.handle_event(event): return
 
     def update(self):
         self.sidebar.update()
+        
+    def draw_stat(self, screen, x, y, label, value, col=None):
+        l_surf = self.font_small.render(label, True, theme.TEXT_MUTED)
+        v_surf = self.font_bold.render(value, True, col or theme.TEXT_MAIN)
+        screen.blit(l_surf, (x, y))
+        screen.blit(v_surf, (x, y + 20))
 
     def draw(self, screen):
         screen.fill(theme.DEEP_CHARCOAL)
@@ -1157,18 +1694,54 @@ class AnalyticsScene:
         title = self.title_font.render("Performance Analytics", True, theme.TEXT_MAIN)
         screen.blit(title, (tx, 40))
         
-        # Simple Chart Mockup
-        chart_rect = pygame.Rect(tx, 100, SCREEN_WIDTH - tx - 40, 300)
-        pygame.draw.rect(screen, theme.CHARCOAL_CARD, chart_rect, border_radius=15)
-        
-        label = self.font_sub.render("Squad Progression (Average Speed)", True, ELECTRIC_BLUE)
-        screen.blit(label, (chart_rect.x + 20, chart_rect.y + 20))
-        
-        # Draw fake line chart
-        pts = [(280, 350), (350, 320), (420, 340), (490, 280), (560, 250), (630, 270), (700, 220)]
-        if len(pts) > 1:
-            pygame.draw.lines(screen, ELECTRIC_BLUE, False, pts, 3)
-            for p in pts: pygame.draw.circle(screen, WHITE, p, 4)
+        # Controls row
+        x = tx
+        if self.is_coach:
+            self.btn_scope_prev.rect.topleft = (x, 100)
+            self.btn_scope_prev.draw(screen)
+            x += 40
+        s_surf = self.font_sub.render(self.scopes[self.scope_idx][2], True, ELECTRIC_BLUE)
+        screen.blit(s_surf, (x, 100 + (36 - s_surf.get_height()) // 2))
+        x += max(120, s_surf.get_width() + 10)
+        if self.is_coach:
+            self.btn_scope_next.rect.topleft = (x, 100)
+            self.btn_scope_next.draw(screen)
+            x += 50
+        self.drop_metric.rect.topleft = (x, 100)
+        x += self.drop_metric.rect.w + 20
+        for b, (_, days) in zip(self.range_btns, self.RANGES):
+            b.rect.topleft = (x, 100)
+            b.base_bg = ELECTRIC_BLUE if days == self.range_days else None
+            b.draw(screen)
+            x += b.rect.w + 8
+        
+        chart_rect = pygame.Rect(tx, 160, SCREEN_WIDTH - tx - 40, 300)
+        
+        r = self.result
+        if r is None or r['days'] is None:
+            pygame.draw.rect(screen, theme.CHARCOAL_CARD, chart_rect, border_radius=15)
+            msg = "Loading..." if self.loading else "No performance data logged for this period"
+            m_surf = self.font_sub.render(msg, True, theme.TEXT_MUTED)
+            screen.blit(m_surf, (chart_rect.centerx - m_surf.get_width() // 2, chart_rect.centery - 10))
+        else:
+            # Cached surface; re-rendered only for new data, a new size or a theme switch
+            self.chart.rect = chart_rect
+            self.chart.draw(screen)
+            
+            # Summary row
+            sy = chart_rect.bottom + 20
+            p = r['percentiles']
+            self.draw_stat(screen, tx, sy, "LATEST", f"{r['latest']:.1f}")
+            self.draw_stat(screen, tx + 160, sy, f"{analytics.ROLLING_DAYS}-DAY AVG", f"{r['latest_rolling']:.1f}")
+            self.draw_stat(screen, tx + 320, sy, "MEDIAN (P10-P90)", f"{p[50]:.1f} ({p[10]:.1f}-{p[90]:.1f})")
+            if r['last_wow'] is not None:
+                col = EMERALD_GREEN if r['last_wow'] >= 0 else ACCENT_RED
+                self.draw_stat(screen, tx + 560, sy, "WEEK OVER WEEK", f"{r['last_wow']:+.1f}", col)
+            self.draw_stat(screen, tx + 740, sy, "LOGS", str(r['logs']))
+        
+        # Dropdown list on top of everything
+        self.drop_metric.draw(screen)
+        self.drop_metric.draw_list(screen)
 
 class NotificationScene:
     def __init__(self, manager):
@@ -1176,7 +1749,21 @@ class NotificationScene:
         self.is_coach = self.manager.current_user['role'] == 'coach'
         self.sidebar = Sidebar('notifications', self.is_coach)
         self.title_font = pygame.font.SysFont("segoeui", 32, bold=True)
-        self.notifs = database.get_notifications(self.manager.current_user['id'])
+        self.notifs = None # None until the worker returns
+        self.on_enter()
+
+    def on_enter(self):
+        # The last list stays on screen until the new one arrives
+        db_worker.submit(database.get_notifications, self.manager.current_user['id']).then(self.on_notifs)
+
+    def on_exit(self):
+        self.sidebar.hover_idx = -1
+
+    def layout(self, w, h):
+        self.sidebar.layout(h)
+
+    def on_notifs(self, notifs):
+        self.notifs = notifs
         
     def handle_event(self, event):
         self.sidebar.handle_event(event, self.manager)
@@ -1194,7 +1781,10 @@ class NotificationScene:
         title = self.title_font.render("Inbox & Notifications", True, theme.TEXT_MAIN)
         screen.blit(title, (tx, 40))
         
-        if not self.notifs:
+        if self.notifs is None:
+            msg = pygame.font.SysFont("segoeui", 20).render("Loading...", True, theme.TEXT_MUTED)
+            screen.blit(msg, (tx, 100))
+        elif not self.notifs:
             msg = pygame.font.SysFont("segoeui", 20).render("Your inbox is empty", True, theme.TEXT_MUTED)
             screen.blit(msg, (tx, 100))
         else:
@@ -1203,9 +1793,44 @@ class NotificationScene:
                 pygame.draw.rect(screen, theme.CHARCOAL_CARD, rect, border_radius=10)
                 # ... draw notif content ...
 
+# Posted by the DB worker when a result is ready, so an idle loop wakes up for it
+WAKE_EVENT = pygame.event.custom_type()
+
+# Input that keeps the loop at full rate for IDLE_AFTER_MS
+INPUT_EVENTS = {pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT, pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN,
+                pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL, pygame.VIDEORESIZE}
+
+def post_wake():
+    try:
+        pygame.event.post(pygame.event.Event(WAKE_EVENT))
+    except pygame.error:
+        pass # Display already closed
+
+def coalesce_motion(events):
+    # A fast mouse sends dozens of MOUSEMOTION per frame: merge each run of consecutive ones into
+    # one event (last pos, summed rel) so a frame's input cost doesn't grow with the polling rate.
+    # Anything else in between (clicks, keys) splits the run, so the order of events is kept.
+    out = []
+    for event in events:
+        prev = out[-1] if out else None
+        if event.type == pygame.MOUSEMOTION and prev is not None and prev.type == pygame.MOUSEMOTION:
+            attrs = dict(event.dict)
+            attrs['rel'] = (prev.rel[0] + event.rel[0], prev.rel[1] + event.rel[1])
+            out[-1] = pygame.event.Event(pygame.MOUSEMOTION, attrs)
+        else:
+            out.append(event)
+    return out
+
+# Scenes kept alive between visits (per user); switching back calls their on_enter()
+# instead of rebuilding fonts, widgets and queries. Login and editor are always new.
+RETAINED_SCENES = {'dashboard': DashboardScene, 'team': TeamScene, 'analytics': AnalyticsScene, 'notifications': NotificationScene}
+SCENE_CACHE_SIZE = 4
+
 class SceneManager:
     def __init__(self):
         self.current_user = None
+        self.session_cache = {} # user_id -> {date: [session meta]} (see DashboardScene)
+        self.scenes = OrderedDict() # (scene name, user id) -> scene, least recently used first
         self.scene = LoginScene(self)
         
         # Global Theme Toggle
@@ -1223,18 +1848,51 @@ class SceneManager:
         self.btn_theme.base_text = ACCENT_YELLOW if theme.mode == 'dark' else (50, 50, 100)
         
     def switch_scene(self, scene_name, data=None):
-        if scene_name == "login":
+        if hasattr(self.scene, 'on_exit'): self.scene.on_exit()
+        if scene_name in RETAINED_SCENES and self.current_user:
+            key = (scene_name, self.current_user['id'])
+            scene = self.scenes.pop(key, None)
+            if scene is None:
+                scene = RETAINED_SCENES[scene_name](self)
+            else:
+                scene.on_enter()
+            self.scenes[key] = scene
+            while len(self.scenes) > SCENE_CACHE_SIZE:
+                self.scenes.popitem(last=False)
+            self.scene = scene
+        elif scene_name == "login":
+            self.scenes.clear() # Nothing of the previous user survives a logout
             self.scene = LoginScene(self)
-        elif scene_name == "dashboard":
-            self.scene = DashboardScene(self)
-        elif scene_name == "team":
-            self.scene = TeamScene(self)
-        elif scene_name == "analytics":
-            self.scene = AnalyticsScene(self)
-        elif scene_name == "notifications":
-            self.scene = NotificationScene(self)
         elif scene_name == "editor":
             self.scene = EditorScene(self, data)
+        self.fit(self.scene)
+
+    def fit(self, scene):
+        # Lay the scene out for the current window size: new scenes once (their panels start at the
+        # default size), retained ones again only if the window changed while they were hidden
+        size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        if hasattr(scene, 'layout') and getattr(scene, 'layout_size', None) != size:
+            scene.layout(*size)
+        scene.layout_size = size
+
+    def apply_resize(self, size):
+        global SCREEN_WIDTH, SCREEN_HEIGHT
+        print(f"Resizing to: {size}")
+        SCREEN_WIDTH, SCREEN_HEIGHT = size
+        projector.update_config(SCREEN_WIDTH, SCREEN_HEIGHT) # The pitch is drawn through the projector
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
+        self.btn_theme.rect.x = SCREEN_WIDTH - 110
+        self.fit(self.scene)
+        return screen
+
+    def scene_animating(self):
+        # Anything that changes without input: playback, sidebar slides, timed banners
+        scene = self.scene
+        if hasattr(scene, 'is_animating') and scene.is_animating(): return True
+        for name in ('sidebar', 'side_panel'):
+            panel = getattr(scene, name, None)
+            if panel is not None and panel.is_animating(): return True
+        return False
             
     def run(self):
         # Use a local reference to dimensions to allow updates
@@ -1250,53 +1908,38 @@ class SceneManager:
         except:
             pass # Icon skip if missing
         clock = pygame.time.Clock()
+        db_worker.on_ready = post_wake
+        last_input = pygame.time.get_ticks()
+        drawn_scene = None # Scene shown by the last full redraw
+        pending_size, resize_at = None, 0
+        self.fit(self.scene)
         
         running = True
         while running:
-            for event in pygame.event.get():
+            # Adaptive frame rate: when idle, sleep until an event arrives (or IDLE_WAIT_MS passes)
+            animating = self.scene_animating()
+            if pygame.time.get_ticks() - last_input > IDLE_AFTER_MS and not animating:
+                wait = IDLE_WAIT_MS
+                due = dirty.next_due()
+                if due is not None: wait = max(1, min(wait, due - pygame.time.get_ticks()))
+                first = pygame.event.wait(wait)
+                events = ([first] if first.type != pygame.NOEVENT else []) + pygame.event.get()
+            else:
+                events = pygame.event.get()
+            events = coalesce_motion(events)
+            
+            for event in events:
+                if event.type in INPUT_EVENTS:
+                    last_input = pygame.time.get_ticks()
+                if event.type == WAKE_EVENT: continue # DB results are dispatched below
                 if event.type == pygame.QUIT:
                     running = False
                 
                 if event.type == pygame.VIDEORESIZE:
-                    print(f"Resizing to: {event.size}")
-                    SCREEN_WIDTH, SCREEN_HEIGHT = event.size
-                    projector.update_config(SCREEN_WIDTH, SCREEN_HEIGHT)
-                    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
-                    
-                    # Update Global Theme Button Pos
-                    self.btn_theme.rect.x = SCREEN_WIDTH - 110
-                    
-                    # Re-init current scene to adapt to new dimensions if possible
-                    # We preserve user/session data
-                    if isinstance(self.scene, LoginScene):
-                        self.scene = LoginScene(self)
-                    elif isinstance(self.scene, DashboardScene):
-                        self.scene = DashboardScene(self)
-                    elif isinstance(self.scene, EditorScene):
-                        # Capture current editor state to re-init
-                        data = {
-                            'id': self.scene.session_id,
-                            'title': self.scene.input_title.text,
-                            'note': self.scene.input_note.text,
-                            'time': self.scene.input_time.text,
-                            'current_tool': self.scene.current_tool,
-                            'playing': self.scene.playing,
-                            'data': {
-                                'players': [{'id': p.id, 'x': p.pos.x, 'y': p.pos.y, 'color': p.color, 'stroke': p.stroke_color, 'label': p.label, 'type': p.type} for p in self.scene.players],
-                                'frames': list(self.scene.frames),
-                                'text_labels': [{'id': t.id, 'x': t.pos.x, 'y': t.pos.y, 'text': t.text, 'color': t.color} for t in self.scene.text_labels],
-                                'arrows': self.scene.arrows 
-                            }
-                        }
-                        old_scene = self.scene
-                        self.scene = EditorScene(self, data)
-                        self.scene.current_tool = data['current_tool']
-                        self.scene.playing = data['playing']
-                        self.scene.arrows = data['data']['arrows']
-                        # Restore player current positions (EditorScene.__init__ uses start_pos)
-                        for i, p in enumerate(self.scene.players):
-                             if i < len(old_scene.players):
-                                 p.pos = old_scene.players[i].pos.copy()
+                    # Dragging the window edge sends a stream of these: relayout once it settles
+                    pending_size = event.size
+                    resize_at = pygame.time.get_ticks() + RESIZE_DEBOUNCE_MS
+                    continue
 
                 # Handle Global Theme Toggle first
                 if self.btn_theme.handle_event(event):
@@ -1304,13 +1947,41 @@ class SceneManager:
                 else:
                     self.scene.handle_event(event)
 
+            if pending_size and pygame.time.get_ticks() >= resize_at:
+                screen = self.apply_resize(pending_size)
+                pending_size = None
+                drawn_scene = None # Full redraw at the new size
+
+            # Results from the DB worker (callbacks run here, on the main loop)
+            delivered = db_worker.dispatch()
+            
             self.scene.update()
-            self.scene.draw(screen)
-            self.btn_theme.draw(screen)
             
-            pygame.display.flip()
-            clock.tick(60)
+            # Full redraw unless this frame only moved the mouse over widgets or blinked a cursor;
+            # then only the areas they reported (ui_components.dirty) are repainted
+            motion_only = all(e.type in (pygame.MOUSEMOTION, WAKE_EVENT) and not any(getattr(e, 'buttons', ())) for e in events)
+            if getattr(self.scene, 'redraw_on_motion', False) and any(e.type == pygame.MOUSEMOTION for e in events):
+                motion_only = False
+            if self.scene is not drawn_scene or delivered or animating or not motion_only:
+                dirty.clear()
+                self.scene.draw(screen)
+                self.btn_theme.draw(screen)
+                pygame.display.flip()
+                drawn_scene = self.scene
+            else:
+                rects = dirty.take(pygame.time.get_ticks())
+                if rects: # Nothing reported -> nothing changed, no drawing at all
+                    screen.set_clip(rects[0].unionall(rects[1:]))
+                    self.scene.draw(screen)
+                    self.btn_theme.draw(screen)
+                    screen.set_clip(None)
+                    pygame.display.update(rects)
+            clock.tick(FPS)
             
+        if hasattr(self.scene, 'shutdown'): self.scene.shutdown()
+        db_worker.on_ready = None
+        db_worker.stop() # Finish queued writes
+        database.close_connection()
         pygame.quit()
         sys.exit()
 
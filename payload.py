@@ -0,0 +1,209 @@
+import json
+import struct
+import zlib
+import numpy as np
+
+# Compact binary encoding for drill content (session_steps / session_objects rows and whole payloads).
+#
+#   byte 0   format version (VERSION)
+#   byte 1   flags (FLAG_ZLIB: the rest is zlib-compressed)
+#   rest     one tagged value (see encode_value)
+#
+# Floats are stored as float32 (positions are normalised pitch coordinates), colours as an index
+# into PALETTE, and a step ({obj_id: [x, y]}) as its NUL-joined ids followed by one packed float32 array.
+# Old rows/blobs are JSON text; decode() still reads them.
+# Lengths and counts are u16; the rare longer string/list/dict uses the *32 tag with a u32 length,
+# and a float beyond float32 range is stored as T_DOUBLE (added without a VERSION bump: older
+# builds could never write such values). Ints outside int64 are refused with ValueError.
+
+VERSION = 1
+FLAG_ZLIB = 1
+COMPRESS_MIN = 64 # Smaller bodies are never worth compressing
+
+# Index = stored byte. Append only: reordering would change the colours of saved drills.
+PALETTE = [
+    (220, 38, 38),   # TEAM_A_COLOR
+    (127, 29, 29),   # TEAM_A_STROKE
+    (37, 99, 235),   # TEAM_B_COLOR
+    (30, 58, 138),   # TEAM_B_STROKE
+    (255, 255, 255), # WHITE / BALL_COLOR / GOAL_COLOR
+    (20, 20, 20),    # BALL_STROKE
+    (245, 158, 11),  # CONE_COLOR
+    (250, 204, 21),  # LADDER_COLOR
+    (0, 0, 0),       # BLACK
+    (0, 190, 255),   # ELECTRIC_BLUE
+    (0, 210, 140),   # EMERALD_GREEN
+    (250, 200, 50),  # ACCENT_YELLOW
+    (240, 60, 60),   # ACCENT_RED
+    (255, 255, 0),   # ARROW_PASS
+]
+_PALETTE_IDX = {c: i for i, c in enumerate(PALETTE)}
+
+# Frequent dict keys are stored as one byte (append only, like PALETTE)
+KEYS = ['id', 'x', 'y', 'color', 'stroke', 'label', 'type', 'text', 'size',
+        'players', 'frames', 'text_labels', 'note', 'arrows', 'points']
+_KEY_IDX = {k: i for i, k in enumerate(KEYS)}
+_KEY_INLINE = 0xFF
+
+# Value tags
+T_NONE, T_TRUE, T_FALSE, T_INT, T_FLOAT, T_STR, T_COLOR, T_RGB, T_LIST, T_DICT, T_STEP, T_BIGINT, T_STR32, T_LIST32, T_DICT32, T_DOUBLE = range(16)
+U16_MAX = 0xFFFF
+
+_u16 = struct.Struct('<H')
+_u32 = struct.Struct('<I')
+_i32 = struct.Struct('<i')
+_f32 = struct.Struct('<f')
+_f64 = struct.Struct('<d')
+_i64 = struct.Struct('<q')
+
+
+def _is_color(v):
+    return len(v) == 3 and all(type(c) is int and 0 <= c <= 255 for c in v)
+
+def _is_step(v):
+    # {obj_id: [x, y]} as saved by the editor's ADD STEP (absurdly large ones go through T_DICT32)
+    return v and len(v) <= U16_MAX and sum(len(k.encode('utf-8')) + 1 for k in v if isinstance(k, str)) <= U16_MAX and all(isinstance(k, str) and isinstance(p, (list, tuple)) and len(p) == 2
+                     and all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in p) for k, p in v.items())
+
+def _put_str(out, s):
+    # Ids and inline keys (always short)
+    b = s.encode('utf-8')
+    if len(b) > U16_MAX: raise ValueError(f"Key of {len(b)} bytes is too long (max {U16_MAX})")
+    out += _u16.pack(len(b))
+    out += b
+
+def _put_len(out, tag, tag32, n):
+    if n <= U16_MAX:
+        out.append(tag); out += _u16.pack(n)
+    else:
+        out.append(tag32); out += _u32.pack(n)
+
+def encode_value(v, out):
+    if v is None: out.append(T_NONE)
+    elif v is True: out.append(T_TRUE)
+    elif v is False: out.append(T_FALSE)
+    elif isinstance(v, int):
+        if -2**31 <= v < 2**31:
+            out.append(T_INT); out += _i32.pack(v)
+        elif -2**63 <= v < 2**63:
+            out.append(T_BIGINT); out += _i64.pack(v)
+        else:
+            raise ValueError(f"Integer {v} does not fit in 64 bits")
+    elif isinstance(v, float):
+        try:
+            packed = _f32.pack(v)
+        except OverflowError: # Finite but beyond float32
+            out.append(T_DOUBLE); out += _f64.pack(v)
+        else:
+            out.append(T_FLOAT); out += packed
+    elif isinstance(v, str):
+        b = v.encode('utf-8')
+        _put_len(out, T_STR, T_STR32, len(b))
+        out += b
+    elif isinstance(v, (list, tuple)):
+        if _is_color(v):
+            idx = _PALETTE_IDX.get(tuple(v))
+            if idx is not None:
+                out.append(T_COLOR); out.append(idx)
+            else:
+                out.append(T_RGB); out += bytes(v)
+            return
+        _put_len(out, T_LIST, T_LIST32, len(v))
+        for item in v: encode_value(item, out)
+    elif isinstance(v, dict):
+        if _is_step(v):
+            out.append(T_STEP); out += _u16.pack(len(v))
+            _put_str(out, '\0'.join(v)) # All ids in one string: a single decode on load
+            out += np.asarray(list(v.values()), dtype='<f4').tobytes()
+            return
+        _put_len(out, T_DICT, T_DICT32, len(v))
+        for k, item in v.items():
+            idx = _KEY_IDX.get(k)
+            if idx is not None: out.append(idx)
+            else:
+                out.append(_KEY_INLINE); _put_str(out, str(k))
+            encode_value(item, out)
+    else:
+        raise TypeError(f"Cannot encode {type(v).__name__}")
+
+
+def _get_str(buf, pos, size=_u16):
+    n = size.unpack_from(buf, pos)[0]
+    pos += size.size
+    if pos + n > len(buf): raise ValueError("Truncated string")
+    return buf[pos:pos + n].decode('utf-8'), pos + n
+
+def decode_value(buf, pos):
+    tag = buf[pos]
+    pos += 1
+    if tag == T_NONE: return None, pos
+    if tag == T_TRUE: return True, pos
+    if tag == T_FALSE: return False, pos
+    if tag == T_INT: return _i32.unpack_from(buf, pos)[0], pos + 4
+    if tag == T_BIGINT: return _i64.unpack_from(buf, pos)[0], pos + 8
+    if tag == T_FLOAT: return _f32.unpack_from(buf, pos)[0], pos + 4
+    if tag == T_DOUBLE: return _f64.unpack_from(buf, pos)[0], pos + 8
+    if tag == T_STR: return _get_str(buf, pos)
+    if tag == T_STR32: return _get_str(buf, pos, _u32)
+    if tag == T_COLOR: return list(PALETTE[buf[pos]]), pos + 1
+    if tag == T_RGB: return list(buf[pos:pos + 3]), pos + 3
+    if tag in (T_LIST, T_LIST32):
+        size = _u16 if tag == T_LIST else _u32
+        n = size.unpack_from(buf, pos)[0]
+        pos += size.size
+        items = []
+        for _ in range(n):
+            item, pos = decode_value(buf, pos)
+            items.append(item)
+        return items, pos
+    if tag in (T_DICT, T_DICT32):
+        size = _u16 if tag == T_DICT else _u32
+        n = size.unpack_from(buf, pos)[0]
+        pos += size.size
+        d = {}
+        for _ in range(n):
+            k = buf[pos]
+            pos += 1
+            if k == _KEY_INLINE: k, pos = _get_str(buf, pos)
+            else: k = KEYS[k]
+            d[k], pos = decode_value(buf, pos)
+        return d, pos
+    if tag == T_STEP:
+        n = _u16.unpack_from(buf, pos)[0]
+        pos += 2
+        ids, pos = _get_str(buf, pos)
+        ids = ids.split('\0') if n else []
+        xy = np.frombuffer(buf, dtype='<f4', count=n * 2, offset=pos).reshape(n, 2).tolist()
+        return dict(zip(ids, xy)), pos + n * 8
+    raise ValueError(f"Unknown payload tag {tag}")
+
+
+def encode(obj):
+    """Any drill value (step, object dict, whole payload) -> versioned bytes."""
+    body = bytearray()
+    encode_value(obj, body)
+    flags = 0
+    if len(body) >= COMPRESS_MIN:
+        packed = zlib.compress(bytes(body), 6)
+        if len(packed) < len(body):
+            body, flags = packed, FLAG_ZLIB
+    return bytes((VERSION, flags)) + bytes(body)
+
+def decode(blob):
+    """Inverse of encode(); also accepts the legacy JSON text (str or bytes). Raises ValueError on any bad blob."""
+    if blob is None: return None
+    if isinstance(blob, str): return json.loads(blob)
+    if blob[:1] in (b'{', b'['): return json.loads(blob)
+    if len(blob) < 3: raise ValueError("Truncated payload")
+    version, flags = blob[0], blob[1]
+    if version > VERSION:
+        raise ValueError(f"Payload version {version} is newer than this app ({VERSION})")
+    try:
+        body = blob[2:]
+        if flags & FLAG_ZLIB: body = zlib.decompress(body)
+        body = bytes(body)
+        value, end = decode_value(body, 0)
+    except (struct.error, IndexError, KeyError, UnicodeDecodeError, zlib.error) as e:
+        raise ValueError(f"Corrupt payload: {e}") from e
+    if end != len(body): raise ValueError("Corrupt payload: trailing bytes")
+    return value
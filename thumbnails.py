@@ -0,0 +1,169 @@
+import os
+import threading
+import queue
+import pygame
+import database
+from constants import *
+from pitch import Pitch
+
+# Drill preview thumbnails: a small top-down pitch with the drill's objects and their runs.
+# Rendering happens on one background thread; finished thumbnails are PNGs on disk named by the
+# drill's content hash (drill_contents.hash), so sessions sharing a drill share one file and an
+# edited drill gets a new one. Scenes call service.request(session_id) when a card becomes
+# visible and draw service.get(session_id) once it is there.
+
+THUMB_DIR = "thumbnails"
+THUMB_SIZE = (240, 156) # ~ pitch ratio (1.54:1)
+THUMB_VERSION = 1 # Bump when render() changes: old files are then ignored (and pruned)
+THUMB_MAX_FILES = 500
+MEMORY_MAX = 64 # Decoded thumbnails kept in memory
+
+# Posted when a thumbnail is ready: event.session_id, event.surface
+THUMBNAIL_EVENT = pygame.event.custom_type()
+
+_pitch = None # Colours and FIFA dimensions (Pitch itself draws through the shared projector)
+
+
+def render(data, size=THUMB_SIZE):
+    """Drill payload ({'players', 'frames', ...}) -> top-down preview Surface. Safe off the main thread."""
+    global _pitch
+    if _pitch is None: _pitch = Pitch()
+    p = _pitch
+    w, h = size
+    surf = pygame.Surface(size)
+    surf.fill(p.grass_dark)
+
+    # Pitch area, keeping the 1.54:1 ratio
+    fw = min(w - 8, (h - 8) * 1.54)
+    fh = fw / 1.54
+    fx, fy = (w - fw) / 2, (h - fh) / 2
+    def to_px(x, y):
+        if x > 1 or y > 1: x, y = x / SCREEN_WIDTH, y / SCREEN_HEIGHT # Old pixel positions (as DrillObject)
+        return fx + x * fw, fy + y * fh
+
+    cols = 18
+    for c in range(cols):
+        if c % 2 == 0:
+            pygame.draw.rect(surf, p.grass_base, (fx + c * fw / cols, fy, fw / cols + 1, fh))
+
+    line = p.line_color[:3]
+    pygame.draw.rect(surf, line, (fx, fy, fw, fh), 1)
+    pygame.draw.line(surf, line, to_px(0.5, 0), to_px(0.5, 1))
+    rx, ry = p.CENTER_CIRCLE_RX * fw, p.CENTER_CIRCLE_RY * fh
+    pygame.draw.ellipse(surf, line, (fx + fw / 2 - rx, fy + fh / 2 - ry, rx * 2, ry * 2), 1)
+    for box_l, box_w in ((p.PENALTY_BOX_L, p.PENALTY_BOX_W), (p.GOAL_AREA_L, p.GOAL_AREA_W)):
+        top = (1 - box_w) / 2
+        pygame.draw.rect(surf, line, (fx, fy + top * fh, box_l * fw, box_w * fh), 1)
+        pygame.draw.rect(surf, line, (fx + (1 - box_l) * fw, fy + top * fh, box_l * fw, box_w * fh), 1)
+
+    players = data.get('players', []) if data else []
+    frames = data.get('frames', []) if data else []
+
+    # Runs: each object's path through the steps
+    for obj in players:
+        path = [to_px(obj['x'], obj['y'])]
+        key = str(obj['id']) # Step ids are strings once stored
+        path += [to_px(*f[key]) for f in frames if key in f]
+        if len(path) > 1:
+            pygame.draw.lines(surf, obj.get('color', WHITE), False, path, 1)
+
+    r = max(2, h // 30)
+    for obj in players:
+        # Where the drill starts
+        pos = to_px(obj['x'], obj['y'])
+        kind = obj.get('type', 'player')
+        if kind == 'ball':
+            pygame.draw.circle(surf, WHITE, pos, max(2, r - 2))
+        elif kind == 'cone':
+            x, y = pos
+            pygame.draw.polygon(surf, obj.get('color', WHITE), [(x, y - r), (x - r, y + r), (x + r, y + r)])
+        else:
+            pygame.draw.circle(surf, obj.get('color', WHITE), pos, r)
+            pygame.draw.circle(surf, obj.get('stroke', BLACK), pos, r, 1)
+    return surf
+
+
+class ThumbnailService:
+    """One background thread, same shape as weather.WeatherService: request() never blocks."""
+    def __init__(self, size=THUMB_SIZE, cache_dir=THUMB_DIR):
+        self.size = size
+        self.cache_dir = cache_dir
+        self.jobs = queue.Queue()
+        self.pending = set() # session ids queued or being rendered
+        self.latest = {} # session_id -> last thumbnail delivered
+        self.memory = {} # content hash -> Surface (insertion order = age)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def request(self, session_id):
+        with self.lock:
+            if session_id in self.pending: return
+            self.pending.add(session_id)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        self.jobs.put(session_id)
+
+    def get(self, session_id):
+        return self.latest.get(session_id)
+
+    def path_for(self, key):
+        w, h = self.size
+        return os.path.join(self.cache_dir, f"{key}_{w}x{h}_v{THUMB_VERSION}.png")
+
+    def run(self):
+        self.prune()
+        while True:
+            session_id = self.jobs.get()
+            try:
+                self.process(session_id)
+            except Exception as e:
+                print(f"Thumbnail Error: {e}")
+            finally:
+                with self.lock:
+                    self.pending.discard(session_id)
+
+    def process(self, session_id):
+        key = database.get_content_hash(session_id)
+        if key is None: return # Deleted
+        surf = self.memory.get(key)
+        if surf is None:
+            path = self.path_for(key)
+            if os.path.exists(path):
+                surf = pygame.image.load(path)
+            else:
+                surf = render(database.get_session_data(session_id), self.size)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = path + ".tmp.png"
+                pygame.image.save(surf, tmp)
+                os.replace(tmp, path) # Never leave a half-written file under the real name
+            if len(self.memory) >= MEMORY_MAX:
+                self.memory.pop(next(iter(self.memory)))
+            self.memory[key] = surf
+        self.deliver(session_id, surf)
+
+    def deliver(self, session_id, surf):
+        self.latest[session_id] = surf
+        try:
+            pygame.event.post(pygame.event.Event(THUMBNAIL_EVENT, session_id=session_id, surface=surf))
+        except pygame.error:
+            pass # No event queue (headless use)
+
+    def prune(self):
+        # Drop the oldest files beyond THUMB_MAX_FILES, and any from an older THUMB_VERSION
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".png")]
+        except FileNotFoundError:
+            return
+        suffix = f"_v{THUMB_VERSION}.png"
+        old = [n for n in names if not n.endswith(suffix)]
+        current = sorted((n for n in names if n.endswith(suffix)),
+                         key=lambda n: os.path.getmtime(os.path.join(self.cache_dir, n)))
+        for n in old + current[:max(0, len(current) - THUMB_MAX_FILES)]:
+            try:
+                os.remove(os.path.join(self.cache_dir, n))
+            except OSError:
+                pass
+
+
+service = ThumbnailService()
@@ -1,7 +1,61 @@
 import pygame
 import math
+import numpy as np
 from constants import *
 
+
+class DirtyRegions:
+    """
+    Screen areas that changed without anything else in the scene changing: hover highlights
+    and the input cursor blink. Widgets report them here; on frames where that is all that
+    happened, SceneManager redraws only these areas (clipped) and updates just those rects.
+    """
+    def __init__(self):
+        self.rects = []
+        self.timed = {} # rect tuple -> due (ms): repaint then (cursor blink)
+
+    def mark(self, rect):
+        self.rects.append(pygame.Rect(rect))
+
+    def mark_at(self, due, rect):
+        self.timed[tuple(rect)] = due
+
+    def next_due(self):
+        return min(self.timed.values()) if self.timed else None
+
+    def take(self, now):
+        rects = self.rects + [pygame.Rect(r) for r, due in self.timed.items() if due <= now]
+        self.rects = []
+        self.timed = {r: due for r, due in self.timed.items() if due > now}
+        return rects
+
+    def clear(self):
+        # After a full redraw (timed areas are reported again as they draw)
+        self.rects = []
+        self.timed = {}
+
+dirty = DirtyRegions()
+
+
+_icons = {} # size -> scaled app icon
+
+def load_icon(size):
+    """app_icon.png scaled to size x size, loaded once per size. Raises if it cannot be loaded yet."""
+    if size not in _icons:
+        import os
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_icon.png")
+        img = pygame.image.load(path).convert_alpha() # Needs a display mode
+        _icons[size] = pygame.transform.smoothscale(img, (size, size))
+    return _icons[size]
+
+
+def theme_color(color, default):
+    # A colour given as a theme attribute name ('TEXT_MUTED') is looked up when drawn, so it
+    # follows theme switches in scenes that stay alive (retained scenes, an open editor)
+    if not color: return default
+    return getattr(theme, color) if isinstance(color, str) else color
+
+
 class Button:
     def __init__(self, x, y, w, h, text, callback, bg_color=None, text_color=None, icon_shape=None, font_size=16, radius=12):
         self.rect = pygame.Rect(x, y, w, h)
@@ -16,8 +70,8 @@ class Button:
 
     def draw(self, surface):
         # Resolve dynamic colors
-        current_bg = self.base_bg if self.base_bg else theme.UI_PANEL
-        current_text = self.base_text if self.base_text else theme.TEXT_MAIN
+        current_bg = theme_color(self.base_bg, theme.UI_PANEL)
+        current_text = theme_color(self.base_text, theme.TEXT_MAIN)
         
         # Determine actual color to use
         if self.is_hovered:
@@ -79,7 +133,9 @@ class Button:
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
-            self.is_hovered = self.rect.collidepoint(event.pos)
+            hovered = self.rect.collidepoint(event.pos)
+            if hovered != self.is_hovered: dirty.mark(self.rect.inflate(4, 8)) # + shadow
+            self.is_hovered = hovered
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1 and self.rect.collidepoint(event.pos):
                 if self.callback: self.callback()
@@ -130,7 +186,9 @@ class SessionCard:
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
-            self.is_hovered = self.rect.collidepoint(event.pos)
+            hovered = self.rect.collidepoint(event.pos)
+            if hovered != self.is_hovered: dirty.mark(self.rect.inflate(4, 12))
+            self.is_hovered = hovered
             self.action_btn.handle_event(event)
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.action_btn.handle_event(event): return True
@@ -148,7 +206,6 @@ class InputBox:
         self.font = pygame.font.SysFont("segoeui", 20)
         self.active = False
         self.cursor_pos = 0
-        self.cursor_timer = 0
         self.refresh_text()
 
     def handle_event(self, event):
@@ -178,12 +235,8 @@ class InputBox:
 
     def refresh_text(self):
         display_text = "*" * len(self.text) if self.is_password else self.text
-        if not self.text and not self.active: 
-            self.display_text = self.placeholder
-            self.color_text = theme.TEXT_HINT
-        else: 
-            self.display_text = display_text
-            self.color_text = theme.TEXT_MAIN
+        self.show_hint = not self.text and not self.active
+        self.display_text = self.placeholder if self.show_hint else display_text
             
     def set_text(self, text):
         self.text = text
@@ -198,12 +251,14 @@ class InputBox:
         pygame.draw.rect(screen, color_border, self.rect, 2, border_radius=10)
         
         self.refresh_text()
-        txt_surface = self.font.render(self.display_text, True, self.color_text)
+        txt_surface = self.font.render(self.display_text, True, theme.TEXT_HINT if self.show_hint else theme.TEXT_MAIN)
         screen.blit(txt_surface, (self.rect.x + 12, self.rect.y + (self.rect.h - txt_surface.get_height())//2))
         
         if self.active:
-            self.cursor_timer += 1
-            if (self.cursor_timer // 20) % 2 == 0:
+            # Clock based, so the blink keeps its pace at the idle frame rate
+            ticks = pygame.time.get_ticks()
+            dirty.mark_at((ticks // CURSOR_BLINK_MS + 1) * CURSOR_BLINK_MS, self.rect)
+            if (ticks // CURSOR_BLINK_MS) % 2 == 0:
                 display_before = "*" * self.cursor_pos if self.is_password else self.text[:self.cursor_pos]
                 text_width, _ = self.font.size(display_before)
                 cursor_x = self.rect.x + 12 + text_width
@@ -228,23 +283,27 @@ class Sidebar:
         
         self.icon = None
         try:
-            import os
-            icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_icon.png")
-            if os.path.exists(icon_path):
-                img = pygame.image.load(icon_path).convert_alpha()
-                self.icon = pygame.transform.smoothscale(img, (36, 36))
+            self.icon = load_icon(36)
         except: pass
 
         self.btn_theme = Button(15, SCREEN_HEIGHT - 65, 40, 40, "", self.toggle_theme, radius=20)
-        self.btn_collapse = Button(self.current_w - 45, 45, 30, 30, "", self.toggle_collapse, bg_color=theme.UI_PANEL, radius=15)
+        self.btn_collapse = Button(self.current_w - 45, 45, 30, 30, "", self.toggle_collapse, radius=15) # Theme panel colour
 
     def toggle_theme(self):
         new_mode = 'light' if theme.mode == 'dark' else 'dark'
         theme.set_mode(new_mode)
 
+    def layout(self, h):
+        # Window resized: full height, theme button stays at the bottom
+        self.rect.height = h
+        self.btn_theme.rect.y = h - 65
+
     def toggle_collapse(self):
         self.collapsed = not self.collapsed
 
+    def is_animating(self):
+        return self.current_w != (self.min_w if self.collapsed else self.max_w)
+
     def update(self):
         target = self.min_w if self.collapsed else self.max_w
         self.current_w += (target - self.current_w) * 0.15
@@ -256,7 +315,7 @@ class Sidebar:
     def draw(self, surface):
         # Sidebar BG with slight gradient simulation
         pygame.draw.rect(surface, theme.DEEP_CHARCOAL, self.rect)
-        pygame.draw.line(surface, theme.BORDER, (self.current_w-1, 0), (self.current_w-1, SCREEN_HEIGHT), 1)
+        pygame.draw.line(surface, theme.BORDER, (self.current_w-1, 0), (self.current_w-1, self.rect.height), 1)
         
         # Logo Logic
         if self.current_w > 140:
@@ -306,12 +365,14 @@ class Sidebar:
         if self.btn_theme.handle_event(event): return True
         
         if event.type == pygame.MOUSEMOTION:
+            old = self.hover_idx
             self.hover_idx = -1
             for i in range(len(self.items)):
                 iy = self.start_y + i * self.item_height
                 if pygame.Rect(0, iy, self.current_w, self.item_height).collidepoint(event.pos):
                     self.hover_idx = i
                     break
+            if self.hover_idx != old: dirty.mark(self.rect)
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1 and self.hover_idx != -1:
                 target = self.items[self.hover_idx][0]
@@ -401,6 +462,7 @@ class Dropdown:
                     return True
                     
         if event.type == pygame.MOUSEMOTION and self.is_open:
+            old = self.hover_idx
             self.hover_idx = -1
             item_h = 32
             num_show = min(len(self.options), self.max_display)
@@ -409,6 +471,8 @@ class Dropdown:
                 if pygame.Rect(self.rect.x, iy, self.rect.w, item_h).collidepoint(event.pos):
                     self.hover_idx = i + self.scroll_idx
                     break
+            if self.hover_idx != old:
+                dirty.mark((self.rect.x, self.rect.bottom, self.rect.w, num_show * item_h + 12))
         return False
 class SidePanel:
     def __init__(self, title="TOOLS"):
@@ -419,11 +483,17 @@ class SidePanel:
         self.rect = pygame.Rect(0, 0, self.current_w, SCREEN_HEIGHT)
         self.title = title
         self.font_title = pygame.font.SysFont("segoeui", 20, bold=True)
-        self.btn_collapse = Button(self.current_w - 35, 20, 25, 25, "", self.toggle_collapse, bg_color=theme.UI_PANEL, radius=10)
+        self.btn_collapse = Button(self.current_w - 35, 20, 25, 25, "", self.toggle_collapse, radius=10) # Theme panel colour
+
+    def layout(self, h):
+        self.rect.height = h
 
     def toggle_collapse(self):
         self.collapsed = not self.collapsed
 
+    def is_animating(self):
+        return self.current_w != (self.min_w if self.collapsed else self.max_w)
+
     def update(self):
         target = self.min_w if self.collapsed else self.max_w
         self.current_w += (target - self.current_w) * 0.15
@@ -440,7 +510,7 @@ class SidePanel:
 
     def draw(self, surface):
         pygame.draw.rect(surface, theme.DEEP_CHARCOAL, self.rect)
-        pygame.draw.line(surface, theme.BORDER, (self.current_w-1, 0), (self.current_w-1, SCREEN_HEIGHT), 1)
+        pygame.draw.line(surface, theme.BORDER, (self.current_w-1, 0), (self.current_w-1, self.rect.height), 1)
         if self.current_w > 100:
             t_surf = self.font_title.render(self.title, True, theme.ACCENT)
             surface.blit(t_surf, (20, 22))
@@ -505,3 +575,99 @@ class Slider:
         self.handle_x = self.rect.x + rel_x
         if self.callback:
              self.callback(self.val)
+
+def lttb(xs, ys, n_out):
+    """Largest-Triangle-Three-Buckets: indices of at most n_out points that keep the series' shape."""
+    n = len(xs)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    every = (n - 2) / (n_out - 2)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        # Average of the next bucket (the last point for the final bucket)
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, n)
+        cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        # Point in this bucket forming the largest triangle with the previous pick and that average
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+class LineChart:
+    """
+    Line chart card. Series are downsampled to the plot width (LTTB) and the whole card
+    (background, grid, labels, lines) is rendered once to an offscreen surface. draw() only
+    blits it; the surface is rebuilt when the data, the size or the theme changes.
+    """
+    def __init__(self, rect, title=""):
+        self.rect = pygame.Rect(rect)
+        self.title = title
+        self.series = [] # [(xs, ys, color or theme attribute name, width), ...] (x in data units)
+        self.x_range = (0, 1)
+        self.x_labels = ("", "")
+        self.data_version = 0
+        self.surface = None
+        self.surface_key = None
+        self.font = pygame.font.SysFont("segoeui", 12)
+        self.font_title = pygame.font.SysFont("segoeui", 18)
+
+    def set_data(self, series, x_range, x_labels=("", ""), title=None):
+        self.series = [(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), col, w) for x, y, col, w in series]
+        self.x_range = x_range
+        self.x_labels = x_labels
+        if title is not None: self.title = title
+        self.data_version += 1
+
+    def render(self):
+        surf = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        local = surf.get_rect()
+        pygame.draw.rect(surf, theme.CHARCOAL_CARD, local, border_radius=15)
+        if self.title:
+            surf.blit(self.font_title.render(self.title, True, ELECTRIC_BLUE), (20, 15))
+        plot = pygame.Rect(60, 50, local.w - 90, local.h - 85)
+        if plot.w < 10 or plot.h < 10 or not self.series: return surf
+
+        ys_all = np.concatenate([s[1] for s in self.series])
+        lo, hi = float(ys_all.min()), float(ys_all.max())
+        pad = (hi - lo) * 0.08 or 1.0
+        lo, hi = lo - pad, hi + pad
+        x0, x1 = self.x_range
+        sx = plot.w / max(x1 - x0, 1e-9)
+        sy = plot.h / (hi - lo)
+
+        # Grid + value labels
+        for i in range(5):
+            v = lo + (hi - lo) * i / 4
+            y = plot.bottom - (v - lo) * sy
+            pygame.draw.line(surf, theme.BORDER, (plot.x, y), (plot.right, y), 1)
+            l_surf = self.font.render(f"{v:.1f}", True, theme.TEXT_HINT)
+            surf.blit(l_surf, (plot.x - l_surf.get_width() - 8, y - l_surf.get_height() // 2))
+        for text, x, align in ((self.x_labels[0], plot.x, 0), (self.x_labels[1], plot.right, 1)):
+            l_surf = self.font.render(text, True, theme.TEXT_HINT)
+            surf.blit(l_surf, (x - l_surf.get_width() * align, plot.bottom + 8))
+
+        # Series: at most ~one point per pixel column
+        for xs, ys, color, width in self.series:
+            if isinstance(color, str): color = getattr(theme, color) # Theme attribute name, e.g. 'TEXT_HINT'
+            if len(xs) > plot.w:
+                keep = lttb(xs, ys, plot.w)
+                xs, ys = xs[keep], ys[keep]
+            px = plot.x + (xs - x0) * sx
+            py = plot.bottom - (ys - lo) * sy
+            pts = list(zip(px.tolist(), py.tolist()))
+            if len(pts) > 1:
+                pygame.draw.lines(surf, color, False, pts, width)
+            if len(pts) <= 60 and width > 1:
+                for p in pts: pygame.draw.circle(surf, WHITE, p, 3)
+        return surf
+
+    def draw(self, screen):
+        key = (self.data_version, self.rect.size, theme.mode)
+        if key != self.surface_key:
+            self.surface = self.render()
+            self.surface_key = key
+        screen.blit(self.surface, self.rect.topleft)
@@ -1,10 +1,40 @@
 import urllib.request
 import json
+import os
 import threading
+import queue
+import time
+import datetime
+import pygame
+import database
 
-# Tel Aviv Coordinates
+# Home ground (Tel Aviv): the default venue
 LAT = 32.0853
 LON = 34.7818
+HOME_VENUE = "Main Pitch"
+
+# Grounds offered in the editor: name -> (lat, lon). Sessions store the name and the
+# coordinates themselves, so editing this list never changes where a saved session is.
+VENUES = {
+    HOME_VENUE: (LAT, LON),
+    "Bloomfield (Tel Aviv)": (32.0526, 34.7612),
+    "HaMoshava (Petah Tikva)": (32.1087, 34.8655),
+    "Netanya Stadium": (32.2936, 34.8637),
+    "Sammy Ofer (Haifa)": (32.7830, 34.9651),
+    "Teddy (Jerusalem)": (31.7512, 35.1907),
+    "Turner (Be'er Sheva)": (31.2736, 34.7797),
+}
+
+# Forecasts are cached in SQLite (weather_cache). The cached copy is always served first;
+# a network refresh only starts when it is older than WEATHER_TTL (stale-while-revalidate).
+WEATHER_TTL = 3 * 60 * 60 # seconds
+FETCH_TIMEOUT = 10 # seconds per HTTP request
+BACKOFF_BASE = 30 # First retry delay after a failed fetch; doubles per failure
+BACKOFF_MAX = 30 * 60
+BATCH_MAX = 50 # Locations per HTTP request (open-meteo takes comma separated lists)
+
+# Posted to the pygame event queue: event.loc, event.forecast ({date: {'temp', 'desc'}})
+WEATHER_EVENT = pygame.event.custom_type()
 
 def get_weather_desc(code):
     # WMO Weather interpretation codes (WW)
@@ -17,31 +47,145 @@ def get_weather_desc(code):
     if code >= 95: return "Thunderstorm"
     return "Cloudy"
 
-def fetch_weather_forecast(callback):
+def location_key(lat, lon):
+    # ~1 km grid: nearby requests share a cache entry
+    return f"{lat:.2f},{lon:.2f}"
+
+def session_venue(session):
+    # (name, lat, lon) of a session dict; sessions without one are at the home ground
+    if session and session.get('venue_lat') is not None and session.get('venue_lon') is not None:
+        return session.get('venue_name') or "Away", session['venue_lat'], session['venue_lon']
+    return HOME_VENUE, LAT, LON
+
+def to_display(cached):
+    # {date: {'temp', 'code'}} -> {date: {'temp', 'desc'}}
+    return {d: {'temp': f['temp'], 'desc': get_weather_desc(f['code'])} for d, f in cached.items()}
+
+
+class OpenMeteoProvider:
+    """Default provider. base_url can point at a local stub server (or set WEATHER_API_URL)."""
+    def __init__(self, base_url=None, timeout=FETCH_TIMEOUT):
+        self.base_url = base_url or os.environ.get('WEATHER_API_URL', "https://api.open-meteo.com/v1/forecast")
+        self.timeout = timeout
+
+    def fetch(self, lat, lon):
+        """Blocking: {date: {'temp', 'code'}}"""
+        return self.fetch_many([(lat, lon)])[0]
+
+    def fetch_many(self, coords):
+        """Blocking: one request for [(lat, lon), ...] -> list of forecasts in the same order."""
+        lats = ",".join(str(lat) for lat, lon in coords)
+        lons = ",".join(str(lon) for lat, lon in coords)
+        url = f"{self.base_url}?latitude={lats}&longitude={lons}&daily=weathercode,temperature_2m_max&timezone=auto"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode())
+        if isinstance(data, dict): data = [data] # A single location is not wrapped in a list
+        if len(data) != len(coords):
+            raise ValueError(f"Expected {len(coords)} forecasts, got {len(data)}")
+        forecasts = []
+        for item in data:
+            daily = item.get('daily', {})
+            times = daily.get('time', [])
+            codes = daily.get('weathercode', [])
+            temps = daily.get('temperature_2m_max', [])
+            forecasts.append({times[i]: {'temp': temps[i], 'code': codes[i]} for i in range(len(times))})
+        return forecasts
+
+
+class WeatherService:
     """
-    Fetches 7-day weather forecast in a background thread and calls callback(forecast_dict)
-    forecast_dict format: {'YYYY-MM-DD': {'temp': 24, 'desc': 'Clear Sky'}, ...}
+    One background thread for all forecast lookups. request() never blocks: it queues the
+    location (coalesced with an identical request already queued or in flight). The thread
+    takes everything queued at once, reads the cache, refreshes all stale locations with one
+    batched provider call, and posts WEATHER_EVENT for each result, so only the scene that is
+    current when the event is handled receives it.
     """
-    def run():
+    def __init__(self, provider=None):
+        self.provider = provider or OpenMeteoProvider()
+        self.jobs = queue.Queue()
+        self.pending = set() # locs queued or being processed
+        self.latest = {} # loc -> last forecast delivered (display format)
+        self.failures = {} # loc -> (consecutive failures, no retry before)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def request(self, lat=LAT, lon=LON):
+        """Ask for a location's forecast; returns its key (compare with event.loc)."""
+        return self.request_many([(lat, lon)])[0]
+
+    def request_many(self, coords):
+        """Several locations queued as one job (so they share a fetch); returns their keys."""
+        locs, job = [], []
+        with self.lock:
+            for lat, lon in coords:
+                loc = location_key(lat, lon)
+                locs.append(loc)
+                if loc in self.pending: continue
+                self.pending.add(loc)
+                job.append((loc, lat, lon))
+            if job and (self.thread is None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        if job: self.jobs.put(job)
+        return locs
+
+    def get(self, loc):
+        # Last known forecast (no I/O): lets a rebuilt scene show weather on its first frame
+        return self.latest.get(loc)
+
+    def run(self):
+        while True:
+            batch = list(self.jobs.get())
+            while True: # Everything else already queued joins this round
+                try:
+                    batch += self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self.process(batch)
+            except Exception as e:
+                print(f"Weather Error: {e}")
+            finally:
+                with self.lock:
+                    for loc, lat, lon in batch: self.pending.discard(loc)
+
+    def process(self, batch):
+        # batch: [(loc, lat, lon), ...]
+        today = datetime.date.today().strftime("%Y-%m-%d")
+        now = time.time()
+        stale = []
+        for loc, lat, lon in batch:
+            cached, fetched_at = database.get_weather(loc, today)
+            if cached: self.deliver(loc, cached)
+            if fetched_at is not None and now - fetched_at < WEATHER_TTL: continue # Fresh
+            if now < self.failures.get(loc, (0, 0))[1]: continue # Backing off
+            stale.append((loc, lat, lon))
+        for i in range(0, len(stale), BATCH_MAX):
+            self.refresh(stale[i:i + BATCH_MAX], today)
+
+    def refresh(self, chunk, today):
         try:
-            url = f"https://api.open-meteo.com/v1/forecast?latitude={LAT}&longitude={LON}&daily=weathercode,temperature_2m_max&timezone=auto"
-            with urllib.request.urlopen(url) as response:
-                data = json.loads(response.read().decode())
-                daily = data.get('daily', {})
-                times = daily.get('time', [])
-                codes = daily.get('weathercode', [])
-                temps = daily.get('temperature_2m_max', [])
-                
-                forecast = {}
-                for i in range(len(times)):
-                    forecast[times[i]] = {
-                        'temp': temps[i],
-                        'desc': get_weather_desc(codes[i])
-                    }
-                callback(forecast)
+            forecasts = self.provider.fetch_many([(lat, lon) for loc, lat, lon in chunk])
         except Exception as e:
-            print(f"Weather Error: {e}")
-            callback(None)
+            delay = 0
+            for loc, lat, lon in chunk:
+                fails = self.failures.get(loc, (0, 0))[0] + 1
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (fails - 1))
+                self.failures[loc] = (fails, time.time() + delay)
+            print(f"Weather Error: {e} ({len(chunk)} locations, retry in {delay}s)")
+            return
+        results = {loc: f for (loc, lat, lon), f in zip(chunk, forecasts)}
+        for loc in results: self.failures.pop(loc, None)
+        database.put_weather_many(results, time.time(), today)
+        for loc, forecast in results.items(): self.deliver(loc, forecast)
+
+    def deliver(self, loc, forecast):
+        display = to_display(forecast)
+        self.latest[loc] = display
+        try:
+            pygame.event.post(pygame.event.Event(WEATHER_EVENT, loc=loc, forecast=display))
+        except pygame.error:
+            pass # No display/event queue (headless use): latest is still updated
+
 
-    thread = threading.Thread(target=run, daemon=True)
-    thread.start()
+service = WeatherService()